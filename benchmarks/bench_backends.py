@@ -0,0 +1,45 @@
+"""
+Benchmark comparing the python-docx and fast writer backends.
+
+Converts a synthetic Markdown document containing one large table with
+both backends and reports the wall time of each, plus the speedup.
+
+Usage:
+    python benchmarks/bench_backends.py [rows] [cols]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from generate_word_from_md import convert_stream, BACKENDS
+
+def make_table_lines(rows, cols):
+    lines = ["**Large Table Report**\n", "\n"]
+    lines.append('| ' + ' | '.join(f"Column {c}" for c in range(cols)) + ' |\n')
+    lines.append('|' + '---|' * cols + '\n')
+    for r in range(rows):
+        lines.append('| ' + ' | '.join(f"r{r}c{c}" for c in range(cols)) + ' |\n')
+    return lines
+
+def time_backend(lines, backend):
+    start = time.perf_counter()
+    out = io.BytesIO()
+    convert_stream(lines, out, backend=backend)
+    return time.perf_counter() - start, len(out.getvalue())
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    lines = make_table_lines(rows, cols)
+
+    print(f"Table of {rows} rows x {cols} columns")
+    print(f"{'backend':>10} {'seconds':>10} {'bytes':>12}")
+    timings = {}
+    for backend in BACKENDS:
+        elapsed, size = time_backend(lines, backend)
+        timings[backend] = elapsed
+        print(f"{backend:>10} {elapsed:>10.3f} {size:>12}")
+    print(f"Speedup (docx / fast): {timings['docx'] / timings['fast']:.1f}x")
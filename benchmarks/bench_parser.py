@@ -0,0 +1,59 @@
+"""
+Benchmark for the Markdown block tokenizer.
+
+Generates synthetic Markdown of increasing size and times a full pass of
+md_blocks.iter_blocks over it. The per-line cost should stay flat as the
+input grows from 1k to 1M lines, i.e. the tokenizer scales linearly.
+
+Usage:
+    python benchmarks/bench_parser.py [max_lines]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from md_blocks import iter_blocks
+
+# A repeating chunk of Markdown exercising every block type. Fences and
+# table headers repeat verbatim, which is exactly what used to confuse the
+# lines.index() based parser.
+CHUNK = [
+    "**Section Heading**\n",
+    "\n",
+    "A paragraph with **bold text** and a [link](https://example.com).\n",
+    "* Bullet item\n",
+    "    * Nested bullet item\n",
+    "1. Numbered item\n",
+    "\n",
+    "| Name | Value |\n",
+    "| ---- | ----- |\n",
+    "| a    | 1     |\n",
+    "| b    | 2     |\n",
+    "\n",
+    "```python\n",
+    "print('hello')\n",
+    "```\n",
+    "\n",
+]
+
+def make_lines(line_count):
+    repeats = line_count // len(CHUNK) + 1
+    return (CHUNK * repeats)[:line_count]
+
+def time_parse(lines):
+    start = time.perf_counter()
+    block_count = sum(1 for _ in iter_blocks(lines))
+    return time.perf_counter() - start, block_count
+
+if __name__ == "__main__":
+    max_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    print(f"{'lines':>10} {'blocks':>10} {'seconds':>10} {'us/line':>10}")
+    line_count = 1000
+    while line_count <= max_lines:
+        lines = make_lines(line_count)
+        elapsed, block_count = time_parse(lines)
+        print(f"{line_count:>10} {block_count:>10} {elapsed:>10.4f} {elapsed / line_count * 1e6:>10.3f}")
+        line_count *= 10
@@ -0,0 +1,230 @@
+"""
+End-to-end benchmark of the Markdown -> DOCX pipeline.
+
+Generates a seeded synthetic corpus (see corpus.py) and, for each backend,
+times the pipeline stages separately:
+
+    parse    md_blocks.iter_blocks over the source
+    build    adding the blocks to a document
+    save     packaging the document into a .docx
+    inspect  docx_inspect.inspect_docx over the saved package
+
+plus validate_md_to_docx end to end (rule extraction, in-memory conversion,
+inspection and rule checks). Each run happens in a fresh process so its
+peak RSS can be reported, and the best time of --repeat runs is kept.
+
+Results can be saved as a baseline JSON and later runs compared against it;
+the script exits with status 1 if any stage is slower than the baseline by
+more than --tolerance.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--lines N] [--seed S] [--repeat K]
+        [--save-baseline PATH] [--baseline PATH] [--tolerance 0.15] [--min-seconds 0.01]
+        [corpus options]
+"""
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from corpus import write_corpus, add_corpus_arguments, corpus_options
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_pipeline(md_path, backend):
+    """Time each pipeline stage for one backend. Runs in a fresh worker process."""
+    from md_blocks import iter_blocks
+    from generate_word_from_md import new_document, build_document, warm_up
+    from fast_docx_writer import FastDocxWriter, ChunkedDocxWriter, build_fast_document
+    from docx_inspect import inspect_docx
+    from image_cache import ImagePipeline
+
+    warm_up()
+    stages = {}
+
+    start = time.perf_counter()
+    with open(md_path, 'r', encoding='utf-8') as md_file:
+        blocks = list(iter_blocks(md_file))
+    stages['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if backend == 'fast':
+            document = build_fast_document(blocks, FastDocxWriter(), images=ImagePipeline())
+        elif backend == 'chunked':
+            document = build_fast_document(blocks, ChunkedDocxWriter(), images=ImagePipeline())
+        elif backend == 'parallel':
+            from parallel_docx import merge_fragments, render_fragment, iter_section_runs
+            document = FastDocxWriter()
+            merge_fragments(render_fragment, iter_section_runs(blocks), document)
+        else:
+            document = build_document(blocks, new_document(), images=ImagePipeline())
+    stages['build'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    document.save(buffer)
+    stages['save'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer.seek(0)
+    inspect_docx(buffer)
+    stages['inspect'] = time.perf_counter() - start
+
+    return {"stages": stages, "docx_bytes": len(buffer.getvalue()), "peak_rss_mb": peak_rss_mb()}
+
+def run_validation(md_path):
+    """Time validate_md_to_docx end to end. Runs in a fresh worker process."""
+    from generate_word_from_md import warm_up
+    from validate_md_to_docx import validate_md_to_docx, create_expected_rules_from_md
+
+    warm_up()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rules = create_expected_rules_from_md(md_path)
+        passed, _ = validate_md_to_docx(md_path, rules)
+    elapsed = time.perf_counter() - start
+    return {"stages": {"validate": elapsed}, "passed": passed, "peak_rss_mb": peak_rss_mb()}
+
+def best_of(repeat, func, *args):
+    """Run func in a fresh process repeat times, keeping the fastest time of each stage."""
+    best = None
+    context = multiprocessing.get_context('spawn')
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(func, *args).result()
+        if best is None:
+            best = result
+            continue
+        for stage, seconds in result["stages"].items():
+            best["stages"][stage] = min(best["stages"][stage], seconds)
+        if result["peak_rss_mb"] is not None:
+            best["peak_rss_mb"] = max(best["peak_rss_mb"], result["peak_rss_mb"])
+    return best
+
+def run_benchmarks(md_path, backends, repeat=1, validate=True):
+    """
+    Benchmark every backend (and validation) on one Markdown file.
+
+    Returns:
+        dict: {name: {"stages": {stage: seconds}, "peak_rss_mb": float, ...}}
+    """
+    results = {}
+    for backend in backends:
+        results[backend] = best_of(repeat, run_pipeline, md_path, backend)
+    if validate:
+        results['validate'] = best_of(repeat, run_validation, md_path)
+    return results
+
+def compare_to_baseline(report, baseline, tolerance, min_seconds=0.0):
+    """
+    Compare stage times and peak RSS with a baseline report. A stage only
+    counts as regressed if it is also at least min_seconds slower, so
+    timer noise on very short stages is not reported.
+
+    Returns:
+        list: (name, stage, baseline, current, ratio, regressed) for every
+            measurement present in both reports
+    """
+    rows = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        pairs = [(stage, base["stages"][stage], seconds)
+                 for stage, seconds in result["stages"].items() if stage in base["stages"]]
+        if result.get("peak_rss_mb") and base.get("peak_rss_mb"):
+            pairs.append(("peak_rss_mb", base["peak_rss_mb"], result["peak_rss_mb"]))
+        for stage, before, after in pairs:
+            ratio = after / before if before else float('inf')
+            noise = stage != "peak_rss_mb" and after - before < min_seconds
+            rows.append((name, stage, before, after, ratio, ratio > 1 + tolerance and not noise))
+    return rows
+
+def print_report(report):
+    corpus = report["corpus"]
+    megabytes = corpus["bytes"] / (1024 * 1024)
+    print(f"Corpus: {corpus['lines']} lines, {megabytes:.2f} MB (seed {corpus['seed']})")
+    print(f"{'run':>10} {'stage':>10} {'seconds':>10} {'lines/s':>12} {'MB/s':>8}")
+    for name, result in report["results"].items():
+        for stage, seconds in result["stages"].items():
+            lines_per_second = corpus["lines"] / seconds if seconds else float('inf')
+            mb_per_second = megabytes / seconds if seconds else float('inf')
+            print(f"{name:>10} {stage:>10} {seconds:>10.4f} {lines_per_second:>12.0f} {mb_per_second:>8.2f}")
+        total = sum(result["stages"].values())
+        rss = f"{result['peak_rss_mb']:.1f} MB" if result.get("peak_rss_mb") is not None else "n/a"
+        print(f"{name:>10} {'total':>10} {total:>10.4f} {corpus['lines'] / total:>12.0f} {megabytes / total:>8.2f}   peak RSS {rss}")
+
+if __name__ == "__main__":
+    import argparse
+
+    from generate_word_from_md import BACKENDS
+
+    parser = argparse.ArgumentParser(description="Benchmark the Markdown to DOCX pipeline on a synthetic corpus.")
+    add_corpus_arguments(parser)
+    parser.add_argument('--backend', choices=BACKENDS, action='append', default=None,
+                        help="Backend to benchmark; repeat for several (default: all)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per measurement, keeping the fastest (default: 1)")
+    parser.add_argument('--no-validate', action='store_true', help="Skip the validate_md_to_docx run")
+    parser.add_argument('--corpus-dir', default=None, help="Keep the generated corpus here (default: a temporary directory)")
+    parser.add_argument('--json', default=None, help="Also write the report to this JSON file")
+    parser.add_argument('--save-baseline', default=None, metavar='PATH', help="Write the report as the new baseline")
+    parser.add_argument('--baseline', default=None, metavar='PATH', help="Compare against this baseline report")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Allowed slowdown before a stage counts as a regression (default: 0.15 = 15%%)")
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help="Ignore slowdowns smaller than this many seconds (default: 0.01)")
+    args = parser.parse_args()
+
+    options = corpus_options(args)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        md_path = write_corpus(args.corpus_dir or temp_dir, args.lines, args.seed, **options)
+        with open(md_path, 'rb') as md_file:
+            source = md_file.read()
+        report = {
+            "corpus": dict(options, seed=args.seed, lines=source.count(b'\n'), bytes=len(source)),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": run_benchmarks(md_path, args.backend or BACKENDS, args.repeat, not args.no_validate),
+        }
+
+    print_report(report)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"✓ Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("corpus") != report["corpus"]:
+            print("Warning: the baseline was recorded on a different corpus; ratios may not be meaningful")
+        rows = compare_to_baseline(report, baseline, args.tolerance, args.min_seconds)
+        print(f"\nCompared to {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print(f"{'run':>10} {'stage':>12} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for name, stage, before, after, ratio, regressed in rows:
+            print(f"{name:>10} {stage:>12} {before:>10.4f} {after:>10.4f} {ratio:>6.2f}x {'✗ regression' if regressed else '✓'}")
+        regressions = sum(1 for row in rows if row[-1])
+        print(f"\n{regressions} regression(s)")
+        sys.exit(1 if regressions else 0)
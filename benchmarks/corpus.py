@@ -0,0 +1,175 @@
+"""
+Seeded synthetic Markdown corpus generator.
+
+Produces documents in the dialect the converter understands (bold-line
+headings, bullet and numbered lists, pipe tables, fenced code, links and
+images) with a configurable size and mix. The same seed and options always
+produce the same document, so benchmark runs are comparable.
+
+Usage:
+    python benchmarks/corpus.py <output_dir> [--lines N] [--seed S] [--table-rows R] ...
+"""
+import os
+import random
+import struct
+import zlib
+
+WORDS = (
+    "report data system value process result analysis model table figure "
+    "performance memory section output input document format style render "
+    "stream cache build release window nightly throughput latency budget"
+).split()
+
+LANGUAGES = ('python', 'bash', 'json', '')
+
+# Default mix; every key can be overridden through generate_markdown's keyword arguments
+DEFAULT_MIX = {
+    'paragraphs_per_section': 4,   # Heading density: one heading per this many paragraphs
+    'list_items': 6,               # Items per list
+    'list_depth': 2,               # 1 = flat lists, 2 = every other item nested
+    'table_every': 3,              # A table in every Nth section (0 disables)
+    'table_rows': 20,
+    'table_cols': 5,
+    'code_every': 2,               # A fenced code block in every Nth section (0 disables)
+    'code_lines': 8,
+    'link_density': 0.05,          # Probability that a word is a link
+    'bold_density': 0.05,          # Probability that a word is bold
+    'image_every': 0,              # An image in every Nth section (0 disables)
+    'image_count': 3,              # Distinct image files to cycle through
+}
+
+def write_png(path, width, height, rgb):
+    """Write a solid-color RGB PNG without needing Pillow."""
+    row = b'\x00' + bytes(rgb) * width
+    raw = row * height
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw)))
+        f.write(chunk(b'IEND', b''))
+
+def _sentence(rng, mix, words=12):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < mix['link_density']:
+            word = f"[{word}](https://example.com/{word})"
+        elif roll < mix['link_density'] + mix['bold_density']:
+            word = f"**{word}**"
+        parts.append(word)
+    return ' '.join(parts).capitalize() + '.'
+
+def _list_lines(rng, mix, numbered):
+    lines = []
+    for i in range(mix['list_items']):
+        text = _sentence(rng, mix, rng.randint(4, 10))
+        if numbered:
+            lines.append(f"{i + 1}. {text}")
+        elif mix['list_depth'] > 1 and i % 2 == 1:
+            lines.append(f"    * {text}")
+        else:
+            lines.append(f"* {text}")
+    return lines
+
+def _table_lines(rng, mix):
+    cols = mix['table_cols']
+    lines = ['| ' + ' | '.join(f"Column {c + 1}" for c in range(cols)) + ' |',
+             '|' + '---|' * cols]
+    for _ in range(mix['table_rows']):
+        lines.append('| ' + ' | '.join(rng.choice(WORDS) for _ in range(cols)) + ' |')
+    return lines
+
+def _code_lines(rng, mix):
+    lines = ['```' + rng.choice(LANGUAGES)]
+    for i in range(mix['code_lines']):
+        lines.append(f"{'    ' * (i % 3)}{rng.choice(WORDS)}_{i} = {rng.randint(0, 9999)}")
+    lines.append('```')
+    return lines
+
+def generate_markdown(line_count, seed=0, image_paths=(), **mix_overrides):
+    """
+    Generate a Markdown document of roughly line_count lines.
+
+    Args:
+        line_count (int): Target size; generation stops at the first section
+            boundary at or beyond it
+        seed (int): Random seed; the same seed and options give the same text
+        image_paths (sequence): Image files referenced when image_every is set
+        **mix_overrides: Overrides for the keys of DEFAULT_MIX
+
+    Returns:
+        list: Lines of Markdown, each ending with a newline
+    """
+    unknown = set(mix_overrides) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown corpus options: {', '.join(sorted(unknown))}")
+    mix = dict(DEFAULT_MIX, **mix_overrides)
+    rng = random.Random(seed)
+
+    lines = [f"**Synthetic Benchmark Document {seed}**", ""]
+    section = 0
+    while len(lines) < line_count:
+        section += 1
+        lines += [f"**Section {section}: {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}**", ""]
+        for p in range(mix['paragraphs_per_section']):
+            lines += [_sentence(rng, mix, rng.randint(8, 30)), ""]
+            if p == 1 and mix['list_items']:
+                lines += _list_lines(rng, mix, numbered=section % 2 == 0) + [""]
+        if mix['table_every'] and section % mix['table_every'] == 0:
+            lines += _table_lines(rng, mix) + [""]
+        if mix['code_every'] and section % mix['code_every'] == 0:
+            lines += _code_lines(rng, mix) + [""]
+        if mix['image_every'] and image_paths and section % mix['image_every'] == 0:
+            path = image_paths[(section // mix['image_every']) % len(image_paths)]
+            lines += [f"![Figure {section}]({path})", ""]
+    return [line + '\n' for line in lines]
+
+def write_corpus(output_dir, line_count, seed=0, **mix_overrides):
+    """
+    Write a generated document (and its images, if any) to output_dir.
+
+    Returns:
+        str: Path of the Markdown file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    image_paths = []
+    if mix_overrides.get('image_every'):
+        rng = random.Random(seed)
+        for i in range(mix_overrides.get('image_count', DEFAULT_MIX['image_count'])):
+            path = os.path.abspath(os.path.join(output_dir, f"figure_{i + 1}.png"))
+            write_png(path, 1600, 900, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+            image_paths.append(path)
+
+    md_path = os.path.join(output_dir, f"corpus_{line_count}_{seed}.md")
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.writelines(generate_markdown(line_count, seed, image_paths, **mix_overrides))
+    return md_path
+
+def add_corpus_arguments(parser):
+    """Add --lines, --seed and one option per DEFAULT_MIX key to an argparse parser."""
+    parser.add_argument('--lines', type=int, default=20000, help="Approximate document size in lines (default: 20000)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    for key, default in DEFAULT_MIX.items():
+        parser.add_argument('--' + key.replace('_', '-'), type=type(default), default=default,
+                            help=f"(default: {default})")
+
+def corpus_options(args):
+    """Collect the DEFAULT_MIX options from parsed arguments."""
+    return {key: getattr(args, key) for key in DEFAULT_MIX}
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic Markdown corpus.")
+    parser.add_argument('output_dir', help="Directory to write the Markdown file and images to")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    md_path = write_corpus(args.output_dir, args.lines, args.seed, **corpus_options(args))
+    size = os.path.getsize(md_path)
+    print(f"✓ Wrote {md_path} ({size / (1024 * 1024):.2f} MB)")
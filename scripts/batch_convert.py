@@ -0,0 +1,163 @@
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from conversion_profile import ConversionProfiler
+from generate_word_from_md import (convert_stream, warm_up, cache_key_for, open_build_cache,
+                                   open_image_pipeline, POOL_BACKENDS)
+
+def find_markdown_files(source):
+    """
+    Resolve a directory (searched recursively for *.md) or a glob pattern
+    into a sorted list of Markdown file paths.
+    """
+    if os.path.isdir(source):
+        pattern = os.path.join(source, '**', '*.md')
+    else:
+        pattern = source
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def output_path_for(md_file_path, base_dir, output_dir):
+    """Mirror the source file's location below base_dir inside output_dir."""
+    relative = os.path.relpath(md_file_path, base_dir)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + '.docx')
+
+def convert_one(job):
+    """
+    Convert a single file. Runs inside a worker process and never raises;
+    failures are reported in the returned result.
+
+    Args:
+        job (tuple): (md_file_path, output_file_path, backend, cache_dir, image_cache_dir, template, profile)
+
+    Returns:
+        dict: Result record for the manifest
+    """
+    md_file_path, output_file_path, backend, cache_dir, image_cache_dir, template, profile = job
+    start = time.perf_counter()
+    result = {"source": md_file_path, "output": output_file_path, "status": "ok", "error": None, "cached": False}
+    profiler = ConversionProfiler() if profile else None
+    try:
+        cache = open_build_cache(cache_dir) if cache_dir else None
+        images = open_image_pipeline(image_cache_dir)
+        if cache is not None:
+            key = cache_key_for(cache, md_file_path, backend, images, template)
+            result["cached"] = cache.restore(key, output_file_path)
+        if not result["cached"]:
+            os.makedirs(os.path.dirname(output_file_path) or '.', exist_ok=True)
+            with open(md_file_path, 'r', encoding='utf-8') as md_file:
+                convert_stream(md_file, output_file_path, backend=backend, images=images, template=template,
+                               hook=profiler)
+            if cache is not None:
+                cache.store(key, output_file_path, source=md_file_path)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    if profiler is not None:
+        result["profile"] = profiler.report()
+    return result
+
+def batch_convert(source, output_dir, workers=None, chunksize=1, backend='docx', manifest_path=None,
+                  cache_dir=None, cache_max_mb=None, cache_max_age_days=None, image_cache_dir=None, template=None,
+                  profile=False):
+    """
+    Convert every Markdown file matched by `source` across a process pool.
+
+    Args:
+        source (str): Directory to search recursively, or a glob pattern
+        output_dir (str): Directory that receives the .docx files, mirroring the source layout
+        workers (int, optional): Number of worker processes (defaults to the CPU count)
+        chunksize (int): Number of files handed to a worker at a time
+        backend (str): Conversion backend, one of generate_word_from_md.POOL_BACKENDS
+        manifest_path (str, optional): Where to write the JSON manifest
+            (defaults to <output_dir>/manifest.json)
+        cache_dir (str, optional): Build cache directory; unchanged files are restored from it
+        cache_max_mb (float, optional): Cache size limit applied after the run
+        cache_max_age_days (float, optional): Cache age limit applied after the run
+        image_cache_dir (str, optional): Directory of downsampled images shared by all workers
+        template (str, optional): .docx or .dotx template; each worker prepares it once
+        profile (bool): Record per-stage and per-block-type timings of every
+            converted file in the manifest (see conversion_profile)
+
+    Returns:
+        dict: The manifest, with per-file results and totals
+    """
+    if backend not in POOL_BACKENDS:
+        raise ValueError(f"Backend {backend!r} cannot run in a batch, expected one of {POOL_BACKENDS}")
+    md_files = find_markdown_files(source)
+    if os.path.isdir(source) or not md_files:
+        base_dir = source
+    else:
+        # For a glob, mirror the layout below the deepest directory all matches share
+        base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in md_files])
+    jobs = [(path, output_path_for(os.path.abspath(path), os.path.abspath(base_dir), output_dir),
+             backend, cache_dir, image_cache_dir, template, profile)
+            for path in md_files]
+
+    start = time.perf_counter()
+    results = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(template,)) as executor:
+            for result in executor.map(convert_one, jobs, chunksize=max(1, chunksize)):
+                results.append(result)
+                print(f"{'✓' if result['status'] == 'ok' else '✗'} {result['source']} ({result['seconds']:.3f}s{', cached' if result['cached'] else ''})")
+
+    if cache_dir:
+        open_build_cache(cache_dir, cache_max_mb, cache_max_age_days).evict()
+    if image_cache_dir:
+        open_image_pipeline(image_cache_dir).evict()
+
+    manifest = {
+        "source": source,
+        "output_dir": output_dir,
+        "backend": backend,
+        "template": template,
+        "workers": workers or os.cpu_count(),
+        "chunksize": chunksize,
+        "total_files": len(results),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "cached": sum(1 for r in results if r["cached"]),
+        "wall_seconds": round(time.perf_counter() - start, 6),
+        "files": results,
+    }
+
+    manifest_path = manifest_path or os.path.join(output_dir, 'manifest.json')
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    return manifest
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a directory or glob of Markdown files to Word documents in parallel.")
+    parser.add_argument('source', help="Directory (searched recursively for *.md) or glob pattern, e.g. 'docs/**/*.md'")
+    parser.add_argument('output_dir', help="Directory to write the .docx files to")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=1, help="Files handed to a worker at a time (default: 1)")
+    parser.add_argument('--backend', choices=POOL_BACKENDS, default='docx', help="Conversion backend (default: docx)")
+    parser.add_argument('--manifest', default=None, help="Path of the JSON manifest (default: <output_dir>/manifest.json)")
+    parser.add_argument('--cache-dir', default=None, help="Skip files whose sources are unchanged since they were cached here")
+    parser.add_argument('--cache-max-mb', type=float, default=None, help="Evict cache entries beyond this total size")
+    parser.add_argument('--cache-max-age-days', type=float, default=None, help="Evict cache entries unused for this long")
+    parser.add_argument('--image-cache-dir', default=None, help="Keep downsampled images here across runs")
+    parser.add_argument('--template', default=None, help=".docx or .dotx file providing the styles and page setup")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record per-stage and per-block-type timings of each file in the manifest")
+    args = parser.parse_args()
+
+    manifest = batch_convert(args.source, args.output_dir, workers=args.workers, chunksize=args.chunksize,
+                             backend=args.backend, manifest_path=args.manifest, cache_dir=args.cache_dir,
+                             cache_max_mb=args.cache_max_mb, cache_max_age_days=args.cache_max_age_days,
+                             image_cache_dir=args.image_cache_dir, template=args.template,
+                             profile=args.profile)
+
+    print(f"\nConverted {manifest['succeeded']}/{manifest['total_files']} files "
+          f"({manifest['cached']} from cache) in {manifest['wall_seconds']:.2f}s")
+    sys.exit(1 if manifest['failed'] else 0)
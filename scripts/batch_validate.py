@@ -0,0 +1,226 @@
+"""
+Validate many Markdown files concurrently.
+
+Each file is converted in memory, inspected and checked against the rules
+derived from its own source (see validate_md_to_docx) in a worker process.
+Results are streamed as JSON Lines, one record per file in completion
+order, followed by a summary record:
+
+    {"type": "result", "source": ..., "status": "passed"|"failed"|"error",
+     "checks": {...}, "details": {...}, "error": ..., "warnings": [...], "cached": ...,
+     "timings": {"rules": ..., "convert": ..., "inspect": ..., "check": ...}, "seconds": ...}
+    {"type": "summary", "total_files": ..., "passed": ..., "failed": ..., "errors": ...,
+     "skipped": ..., "budget_exceeded": ..., "wall_seconds": ..., "timings": {...}, "slowest": [...]}
+
+With an error budget (--max-failures N) the run stops once more than N
+files have failed or errored; files not yet validated are reported as
+skipped.
+
+Usage:
+    python scripts/batch_validate.py <source> [--workers N] [--jsonl PATH] [--max-failures N]
+"""
+import contextlib
+import io
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from batch_convert import find_markdown_files
+from docx_inspect import inspect_docx
+from generate_word_from_md import convert_stream, warm_up, cache_key_for, open_build_cache, POOL_BACKENDS
+from validate_md_to_docx import expected_rules_from_markdown, check_format_rules, rules_cache_key
+
+# Number of slowest files listed in the summary
+SLOWEST_FILES = 10
+
+def validate_one(job):
+    """
+    Validate a single file. Runs inside a worker process and never raises;
+    failures are reported in the returned result.
+
+    Args:
+        job (tuple): (md_file_path, backend, cache_dir)
+
+    Returns:
+        dict: Result record
+    """
+    md_file_path, backend, cache_dir = job
+    start = time.perf_counter()
+    result = {"type": "result", "source": md_file_path, "status": "error", "checks": {}, "details": {},
+              "error": None, "warnings": [], "cached": False, "timings": {}}
+    timings = result["timings"]
+    # Messages the converter prints (e.g. images it could not embed) become warnings instead of
+    # being interleaved with the JSON Lines on stdout
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            _validate(md_file_path, backend, cache_dir, result)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["warnings"] = messages.getvalue().splitlines()
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    for stage in timings:
+        timings[stage] = round(timings[stage], 6)
+    return result
+
+def _validate(md_file_path, backend, cache_dir, result):
+    """Run the rules, conversion, inspection and checks of one file, filling in result."""
+    timings = result["timings"]
+    # Read the source once for both the rules and the conversion
+    with open(md_file_path, 'r', encoding='utf-8') as md_file:
+        content = md_file.read()
+    step = time.perf_counter()
+    rules = expected_rules_from_markdown(content)
+    timings["rules"] = time.perf_counter() - step
+
+    format_info = None
+    cache = open_build_cache(cache_dir) if cache_dir else None
+    if cache is not None:
+        cache_key = cache_key_for(cache, md_file_path, backend)
+        rules_key = rules_cache_key(rules)
+        cached = cache.load_validation(cache_key, rules_key)
+        if cached is not None:
+            format_info = cached["format_info"]
+            result["cached"] = True
+
+    if format_info is None:
+        step = time.perf_counter()
+        docx_bytes = io.BytesIO()
+        convert_stream(io.StringIO(content), docx_bytes, backend=backend)
+        timings["convert"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        docx_bytes.seek(0)
+        format_info = inspect_docx(docx_bytes)
+        timings["inspect"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    checks = check_format_rules(format_info, rules)
+    timings["check"] = time.perf_counter() - step
+
+    if cache is not None and not result["cached"]:
+        # Validation results are attached to the cached document, as validate_md_to_docx does
+        cache.store_bytes(cache_key, docx_bytes.getvalue(), source=md_file_path)
+        cache.store_validation(cache_key, rules_key, {"passed": checks["passed"], "format_info": format_info})
+    result["checks"] = checks["checks"]
+    result["details"] = checks["details"]
+    result["status"] = "passed" if checks["passed"] else "failed"
+
+def summarize(results, total_files, wall_seconds, budget_exceeded=False):
+    """
+    Build the summary record of a run.
+
+    Args:
+        results (list): Result records of the files that were validated
+        total_files (int): Number of files the run was started with
+        wall_seconds (float): Elapsed time of the run
+        budget_exceeded (bool): Whether the run stopped on the error budget
+
+    Returns:
+        dict: The summary record
+    """
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("passed", "failed", "error")}
+    timings = {}
+    for result in results:
+        for stage, seconds in result["timings"].items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+    slowest = sorted(results, key=lambda r: -r["seconds"])[:SLOWEST_FILES]
+    return {
+        "type": "summary",
+        "total_files": total_files,
+        "passed": counts["passed"],
+        "failed": counts["failed"],
+        "errors": counts["error"],
+        "skipped": total_files - len(results),
+        "cached": sum(1 for r in results if r["cached"]),
+        "budget_exceeded": budget_exceeded,
+        "wall_seconds": round(wall_seconds, 6),
+        "timings": {stage: round(seconds, 6) for stage, seconds in timings.items()},
+        "slowest": [{"source": r["source"], "seconds": r["seconds"]} for r in slowest],
+    }
+
+def batch_validate(source, out=None, workers=None, backend='docx', max_failures=None, cache_dir=None):
+    """
+    Validate every Markdown file matched by `source` across a process pool.
+
+    Args:
+        source (str): Directory to search recursively, or a glob pattern
+        out (file, optional): Text stream receiving one JSON line per result
+            as it completes, then the summary line
+        workers (int, optional): Number of worker processes (defaults to the CPU count)
+        backend (str): Conversion backend, one of generate_word_from_md.POOL_BACKENDS
+        max_failures (int, optional): Error budget; stop once more than this
+            many files have failed or errored. None for no limit
+        cache_dir (str, optional): Build cache directory; validation results of
+            unchanged files are reused from it
+
+    Returns:
+        tuple: (results, summary) - the result records in completion order and the summary record
+    """
+    if backend not in POOL_BACKENDS:
+        raise ValueError(f"Backend {backend!r} cannot run in a batch, expected one of {POOL_BACKENDS}")
+    md_files = find_markdown_files(source)
+    jobs = [(path, backend, cache_dir) for path in md_files]
+
+    start = time.perf_counter()
+    results = []
+    failures = 0
+    budget_exceeded = False
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as executor:
+            futures = [executor.submit(validate_one, job) for job in jobs]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                result = future.result()
+                results.append(result)
+                if out is not None:
+                    out.write(json.dumps(result) + '\n')
+                    out.flush()
+                if result["status"] != "passed":
+                    failures += 1
+                    if max_failures is not None and failures > max_failures and not budget_exceeded:
+                        budget_exceeded = True
+                        for pending in futures:
+                            pending.cancel()
+
+    summary = summarize(results, len(jobs), time.perf_counter() - start, budget_exceeded)
+    if out is not None:
+        out.write(json.dumps(summary) + '\n')
+        out.flush()
+    return results, summary
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate the conversion of many Markdown files in parallel.")
+    parser.add_argument('source', help="Directory (searched recursively for *.md) or glob pattern, e.g. 'docs/**/*.md'")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--backend', choices=POOL_BACKENDS, default='docx', help="Conversion backend (default: docx)")
+    parser.add_argument('--jsonl', default='-', metavar='PATH',
+                        help="Write the JSON Lines results here (default: - for stdout)")
+    parser.add_argument('--max-failures', type=int, default=None, metavar='N',
+                        help="Stop once more than N files have failed or errored (default: no limit; 0 stops at the first)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Reuse validation results of unchanged files from this build cache")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.jsonl == '-' else open(args.jsonl, 'w', encoding='utf-8')
+    try:
+        results, summary = batch_validate(args.source, out, workers=args.workers, backend=args.backend,
+                                          max_failures=args.max_failures, cache_dir=args.cache_dir)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    for result in results:
+        if result["status"] != "passed":
+            reason = result["error"] or ', '.join(check for check, passed in result["checks"].items() if not passed)
+            print(f"✗ {result['source']}: {result['status']} ({reason})", file=sys.stderr)
+    print(f"\nValidated {summary['total_files'] - summary['skipped']}/{summary['total_files']} files "
+          f"in {summary['wall_seconds']:.2f}s: {summary['passed']} passed, {summary['failed']} failed, "
+          f"{summary['errors']} errors, {summary['skipped']} skipped", file=sys.stderr)
+    if summary["budget_exceeded"]:
+        print(f"✗ Stopped early: more than {args.max_failures} failures", file=sys.stderr)
+    sys.exit(0 if summary["passed"] == summary["total_files"] else 1)
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from md_blocks import IMAGE_PATTERN
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def referenced_images(md_file_path):
+    """Return the image paths referenced via ![...](...) in a Markdown file, in order."""
+    paths = []
+    with open(md_file_path, 'r', encoding='utf-8') as md_file:
+        for line in md_file:
+            if '![' in line:
+                paths.extend(match.group(2) for match in IMAGE_PATTERN.finditer(line))
+    return paths
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temporary file so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def evict_lru(directory, max_bytes, max_age_seconds):
+    """
+    Evict cache entries from a directory. Files sharing a name stem form one
+    entry whose last use is the newest mtime among them (callers touch
+    entries on use). Entries older than max_age_seconds are removed first,
+    then the least recently used until the total size fits in max_bytes.
+
+    Returns:
+        int: Number of entries removed
+    """
+    entries = {}
+    for name in os.listdir(directory):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stem = os.path.splitext(name)[0]
+        paths, size, used = entries.get(stem, ([], 0, 0))
+        entries[stem] = (paths + [path], size + stat.st_size, max(used, stat.st_mtime))
+
+    now = time.time()
+    removed = 0
+    total = sum(size for _, size, _ in entries.values())
+    for paths, size, used in sorted(entries.values(), key=lambda entry: entry[2]):
+        if now - used <= max_age_seconds and total <= max_bytes:
+            break
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+class BuildCache(object):
+    """
+    On-disk cache of generated DOCX files keyed by content hash.
+
+    A key covers the Markdown bytes, the bytes of every image the Markdown
+    references and any extra version strings supplied by the caller (the
+    converter version, backend and so on). Each entry is stored as
+    <key>.docx plus a <key>.json metadata file, so concurrent writers from
+    a process pool never contend on a shared index.
+
+    Args:
+        cache_dir (str): Directory holding the cache entries
+        max_bytes (int): Total size above which least recently used entries are evicted
+        max_age_seconds (int): Entries not used for longer than this are evicted
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, md_file_path, *versions):
+        """
+        Compute the cache key for a Markdown file.
+
+        Args:
+            md_file_path (str): Path to the Markdown file
+            *versions (str): Converter/style version strings that affect the output
+
+        Returns:
+            str: Hex digest identifying this exact build
+        """
+        digest = hashlib.sha256()
+        digest.update(hash_file(md_file_path).encode('ascii'))
+        for image_path in referenced_images(md_file_path):
+            digest.update(b'\0image\0' + image_path.encode('utf-8') + b'\0')
+            digest.update((hash_file(image_path) or 'missing').encode('ascii'))
+        for version in versions:
+            digest.update(b'\0version\0' + str(version).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _load_metadata(self, key):
+        try:
+            with open(self._entry_path(key, '.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store_metadata(self, key, metadata):
+        _write_atomic(self._entry_path(key, '.json'), json.dumps(metadata).encode('utf-8'))
+
+    def _touch(self, key):
+        now = time.time()
+        for suffix in ('.docx', '.json'):
+            try:
+                os.utime(self._entry_path(key, suffix), (now, now))
+            except OSError:
+                pass
+
+    def lookup(self, key):
+        """Return the path of the cached DOCX for key, or None on a miss."""
+        docx_path = self._entry_path(key, '.docx')
+        if not os.path.exists(docx_path) or self._load_metadata(key) is None:
+            return None
+        self._touch(key)
+        return docx_path
+
+    def restore(self, key, output_file_path):
+        """
+        Make output_file_path hold the cached build for key.
+
+        The output is left untouched when it already matches the cached
+        build, so unchanged documents are skipped entirely.
+
+        Returns:
+            bool: True on a cache hit, False on a miss
+        """
+        cached_path = self.lookup(key)
+        if cached_path is None:
+            return False
+        metadata = self._load_metadata(key)
+        if hash_file(output_file_path) != metadata.get('docx_sha256'):
+            os.makedirs(os.path.dirname(output_file_path) or '.', exist_ok=True)
+            shutil.copyfile(cached_path, output_file_path)
+        return True
+
+    def store(self, key, docx_file_path, source=None):
+        """Copy a freshly generated DOCX into the cache under key."""
+        with open(docx_file_path, 'rb') as f:
+            self.store_bytes(key, f.read(), source=source)
+
+    def store_bytes(self, key, data, source=None):
+        """Store an in-memory DOCX in the cache under key."""
+        _write_atomic(self._entry_path(key, '.docx'), data)
+        self._store_metadata(key, {
+            "source": source,
+            "created": time.time(),
+            "docx_sha256": hashlib.sha256(data).hexdigest(),
+            "validation": None,
+        })
+
+    def load_validation(self, key, rules_key):
+        """Return cached validation results for this build and rule set, or None."""
+        metadata = self._load_metadata(key)
+        if not metadata or not metadata.get('validation'):
+            return None
+        return metadata['validation'].get(rules_key)
+
+    def store_validation(self, key, rules_key, results):
+        """Attach validation results for a rule set to an existing cache entry."""
+        metadata = self._load_metadata(key)
+        if metadata is None:
+            return
+        metadata['validation'] = metadata.get('validation') or {}
+        metadata['validation'][rules_key] = results
+        self._store_metadata(key, metadata)
+
+    def evict(self):
+        """
+        Remove entries unused for longer than max_age_seconds, then remove
+        least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of entries removed
+        """
+        return evict_lru(self.cache_dir, self.max_bytes, self.max_age_seconds)
@@ -0,0 +1,252 @@
+"""
+Conversion instrumentation.
+
+convert_stream() and the batch converter accept a `hook`: any callable that
+is called with one record (a dict) per event while a document is built.
+
+    {"event": "stage", "stage": "setup"|"parse"|"build"|"save", "seconds": ...}
+    {"event": "block", "kind": ..., "line_no": ..., "size": ..., "seconds": ...}
+    {"event": "image", "path": ..., "bytes": ..., "seconds": ...}
+
+Parse time is the time spent pulling blocks from the tokenizer, block time
+is the time spent adding one block to the document, and image time is the
+time spent reading and downsampling an image (part of its block's time;
+repeated images come from the pipeline's memo and take next to none).
+Without a hook none of this is measured. Backends that do not add blocks
+one by one in this process (the parallel backend) report a build stage
+instead of block records.
+
+ConversionProfiler is a hook that aggregates the records into a
+JSON-serializable report: per-stage and per-block-type counts and times,
+image totals and the slowest individual blocks.
+
+Every renderer adds blocks through the same loop: build_blocks dispatches
+each block to the matching method of the renderer's BlockEmitters, loads
+images through the shared pipeline and handles images that cannot be
+added, timing all of it when a hook is given.
+"""
+import heapq
+import io
+import sys
+import time
+
+from md_blocks import HEADING, LIST_ITEM, CODE, TABLE, IMAGE, PARAGRAPH
+
+# Paragraph written in place of an image that could not be added
+IMAGE_ERROR_TEXT = "Image: {alt} - {path} (Error)"
+
+def block_size(block):
+    """A rough measure of a block's size: cells for tables, characters otherwise."""
+    if block.kind == TABLE:
+        return sum(len(row) for row in block.rows)
+    if block.kind == IMAGE:
+        return 0
+    return len(block.text)
+
+def run_emitters(blocks, emitters, target, hook=None):
+    """
+    Add every block to target with the emitter registered for its kind,
+    reporting parse and per-block times to hook if one is given.
+    """
+    if hook is None:
+        for block in blocks:
+            emitters[block.kind](target, block)
+        return
+
+    blocks = iter(blocks)
+    parse_seconds = 0.0
+    while True:
+        start = time.perf_counter()
+        block = next(blocks, None)
+        parsed = time.perf_counter()
+        parse_seconds += parsed - start
+        if block is None:
+            break
+        emitters[block.kind](target, block)
+        hook({"event": "block", "kind": block.kind, "line_no": block.line_no,
+              "size": block_size(block), "seconds": time.perf_counter() - parsed})
+    hook({"event": "stage", "stage": "parse", "seconds": parse_seconds})
+
+class BlockEmitters(object):
+    """
+    How a renderer adds each kind of block to its target (a document or a
+    writer). The defaults call the writer methods HtmlWriter and TextWriter
+    share; renderers override the methods their target names differently.
+    """
+
+    # Whether image blocks are loaded and passed to image(); if not, image() gets None
+    loads_images = True
+
+    def heading(self, target, block):
+        target.add_heading(block.text, block.level)
+
+    def list_item(self, target, block):
+        target.add_list_item(block.text, block.style)
+
+    def code(self, target, block):
+        target.add_code(block.text, block.lang)
+
+    def table(self, target, block):
+        target.add_table(block.rows, block.align)
+
+    def paragraph(self, target, block):
+        target.add_paragraph(block.text)
+
+    def image(self, target, block, data):
+        target.add_image(data, block.text)
+
+    def image_error(self, target, text):
+        """Add the placeholder paragraph of an image that could not be added."""
+        target.add_paragraph(text)
+
+    def emitters(self, images=None):
+        """
+        Return the emitter table for run_emitters: block kind -> emitter(target, block).
+
+        Args:
+            images (ImagePipeline, optional): Image loader, required if loads_images
+        """
+        def add_image(target, block):
+            try:
+                self.image(target, block, images.load(block.path) if self.loads_images else None)
+            except Exception as e:
+                print(f"Error adding image {block.path}: {e}", file=sys.stderr)
+                self.image_error(target, IMAGE_ERROR_TEXT.format(alt=block.text, path=block.path))
+
+        return {
+            HEADING: self.heading,
+            LIST_ITEM: self.list_item,
+            CODE: self.code,
+            TABLE: self.table,
+            IMAGE: add_image,
+            PARAGRAPH: self.paragraph,
+        }
+
+def build_blocks(blocks, target, emitters, images=None, hook=None):
+    """
+    Add a stream of Markdown block records to target; the body of every
+    renderer's build function.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        target: The document or writer to append to
+        emitters (BlockEmitters): The renderer's emitters
+        images (ImagePipeline, optional): Image loader shared by all images in
+            the document, so each distinct image is read and scaled once
+        hook (callable, optional): Instrumentation hook
+
+    Returns:
+        The same target, for chaining
+    """
+    if emitters.loads_images:
+        if images is None:
+            from image_cache import ImagePipeline
+            images = ImagePipeline()
+        if hook is not None:
+            images = TimedImages(images, hook)
+    run_emitters(blocks, emitters.emitters(images), target, hook)
+    return target
+
+class TimedImages(object):
+    """Wraps an ImagePipeline, reporting every image load to hook."""
+
+    def __init__(self, images, hook):
+        self._images = images
+        self._hook = hook
+
+    def __getattr__(self, name):
+        return getattr(self._images, name)
+
+    def load(self, image_path):
+        start = time.perf_counter()
+        data = self._images.load(image_path)
+        self._hook({"event": "image", "path": image_path, "bytes": len(data),
+                    "seconds": time.perf_counter() - start})
+        return data
+
+    def open(self, image_path):
+        return io.BytesIO(self.load(image_path))
+
+class ConversionProfiler(object):
+    """
+    Hook that aggregates instrumentation records.
+
+    Args:
+        slowest (int): Number of slowest blocks to keep in the report
+        keep_events (bool): Also keep every record, in order, as a trace
+    """
+
+    def __init__(self, slowest=10, keep_events=False):
+        self.stages = {}
+        self.blocks = {}
+        self.images = {"count": 0, "seconds": 0.0, "bytes": 0}
+        self.events = [] if keep_events else None
+        self._slowest_count = slowest
+        self._slowest = []
+        self._sequence = 0
+
+    def __call__(self, record):
+        if self.events is not None:
+            self.events.append(record)
+
+        event = record["event"]
+        if event == "stage":
+            self.stages[record["stage"]] = self.stages.get(record["stage"], 0.0) + record["seconds"]
+        elif event == "block":
+            totals = self.blocks.setdefault(record["kind"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "size": 0})
+            totals["count"] += 1
+            totals["seconds"] += record["seconds"]
+            totals["size"] += record["size"]
+            totals["max_seconds"] = max(totals["max_seconds"], record["seconds"])
+            self._sequence += 1
+            entry = (record["seconds"], self._sequence, record)
+            if len(self._slowest) < self._slowest_count:
+                heapq.heappush(self._slowest, entry)
+            elif self._slowest_count:
+                heapq.heappushpop(self._slowest, entry)
+        elif event == "image":
+            self.images["count"] += 1
+            self.images["seconds"] += record["seconds"]
+            self.images["bytes"] += record["bytes"]
+
+    def report(self):
+        """
+        Returns:
+            dict: {"stages": {stage: seconds}, "blocks": {kind: {count, seconds,
+                max_seconds, size}}, "images": {count, seconds, bytes},
+                "slowest_blocks": [block records], and "events" if kept}
+        """
+        stages = dict(self.stages)
+        stages["build"] = stages.get("build", 0.0) + sum(totals["seconds"] for totals in self.blocks.values())
+        report = {
+            "stages": stages,
+            "total_seconds": sum(stages.values()),
+            "blocks": self.blocks,
+            "images": self.images,
+            "slowest_blocks": [{key: value for key, value in record.items() if key != "event"}
+                               for _, _, record in sorted(self._slowest, key=lambda entry: -entry[0])],
+        }
+        if self.events is not None:
+            report["events"] = self.events
+        return report
+
+    def summary(self):
+        """Human-readable summary of the report."""
+        report = self.report()
+        lines = [f"{'stage':>10} {'seconds':>10}"]
+        for stage in ('setup', 'parse', 'build', 'save'):
+            if stage in report["stages"]:
+                lines.append(f"{stage:>10} {report['stages'][stage]:>10.4f}")
+        lines.append(f"{'total':>10} {report['total_seconds']:>10.4f}")
+        lines.append("")
+        lines.append(f"{'block':>10} {'count':>8} {'seconds':>10} {'max':>10}")
+        for kind, totals in sorted(report["blocks"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{kind:>10} {totals['count']:>8} {totals['seconds']:>10.4f} {totals['max_seconds']:>10.4f}")
+        images = report["images"]
+        if images["count"]:
+            lines.append(f"\nImages: {images['count']} loaded, {images['bytes']} bytes, {images['seconds']:.4f}s")
+        if report["slowest_blocks"]:
+            lines.append("\nSlowest blocks:")
+            for record in report["slowest_blocks"]:
+                lines.append(f"  line {record['line_no']}: {record['kind']} (size {record['size']}) {record['seconds']:.4f}s")
+        return '\n'.join(lines)
@@ -0,0 +1,274 @@
+"""
+Long-running Markdown to DOCX conversion server.
+
+Keeps a pool of warm worker processes (python-docx and lxml loaded and the
+document template prepared) behind a small asyncio HTTP/1.1 server, so each
+request pays only for its own conversion.
+
+    POST /convert[?backend=docx|fast|chunked]   body: Markdown (UTF-8) -> DOCX
+    GET  /health                                -> JSON with active/queued counts
+
+At most max_concurrency conversions run at once and at most max_queue
+more wait for a slot; beyond that the server answers 503 with Retry-After
+instead of accepting more work. It can listen on TCP or on a Unix socket
+and needs nothing beyond the standard library and the converter itself.
+"""
+import asyncio
+import io
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from generate_word_from_md import convert_stream, warm_up, POOL_BACKENDS
+from image_cache import ImagePipeline
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+DEFAULT_MAX_BODY_BYTES = 20 * 1024 * 1024
+RESPONSE_CHUNK_SIZE = 64 * 1024
+HEADER_TIMEOUT_SECONDS = 30
+BODY_TIMEOUT_SECONDS = 120
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+class NoImages(ImagePipeline):
+    """Image loader used when no --image-root is configured: requests may not read server files."""
+
+    def load(self, image_path):
+        raise PermissionError("Images are disabled on this server (start it with --image-root)")
+
+def convert_markdown(markdown, backend='docx', image_root=None, template=None):
+    """
+    Convert Markdown text to DOCX bytes. Runs inside a worker process.
+
+    Args:
+        markdown (str): The Markdown source
+        backend (str): Conversion backend, one of POOL_BACKENDS
+        image_root (str, optional): Directory images may be loaded from
+        template (str, optional): .docx or .dotx template file
+
+    Returns:
+        bytes: The .docx package
+    """
+    if backend not in POOL_BACKENDS:
+        raise ValueError(f"Backend {backend!r} is not available on the server")
+    images = ImagePipeline(root=image_root) if image_root else NoImages()
+    buffer = io.BytesIO()
+    convert_stream(io.StringIO(markdown), buffer, backend=backend, images=images, template=template)
+    return buffer.getvalue()
+
+class ConversionServer(object):
+    """
+    Asyncio HTTP front end over a warm process pool.
+
+    Args:
+        workers (int, optional): Worker processes (defaults to the CPU count)
+        max_concurrency (int, optional): Conversions running at once (defaults to workers)
+        max_queue (int): Requests allowed to wait for a free slot before 503s are returned
+        max_body_bytes (int): Largest accepted Markdown body
+        backend (str): Default backend when the request does not choose one
+        image_root (str, optional): Directory images may be loaded from; images are disabled if unset
+        template (str, optional): .docx or .dotx template every document is cloned from
+    """
+
+    def __init__(self, workers=None, max_concurrency=None, max_queue=64,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES, backend='docx', image_root=None, template=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.workers
+        self.max_queue = max_queue
+        self.max_body_bytes = max_body_bytes
+        self.backend = backend
+        self.image_root = image_root
+        self.template = template
+        self.active = 0
+        self.queued = 0
+        self._executor = None
+        self._slots = None
+
+    def start_pool(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up, initargs=(self.template,))
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def convert(self, markdown, backend):
+        """Run one conversion in the pool, waiting for a slot if the queue has room."""
+        if self.queued >= self.max_queue:
+            raise HTTPError(503, "Conversion queue is full, retry later", {'Retry-After': '1'})
+
+        self.queued += 1
+        waiting = True
+        try:
+            async with self._slots:
+                self.queued -= 1
+                waiting = False
+                self.active += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self._executor, convert_markdown, markdown, backend,
+                                                      self.image_root, self.template)
+                finally:
+                    self.active -= 1
+        finally:
+            if waiting:
+                self.queued -= 1
+
+    async def _read_request(self, reader):
+        request_line = await asyncio.wait_for(reader.readline(), HEADER_TIMEOUT_SECONDS)
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), HEADER_TIMEOUT_SECONDS)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _read_body(self, reader, headers):
+        if 'content-length' not in headers:
+            raise HTTPError(411, "Content-Length is required")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f"Body exceeds {self.max_body_bytes} bytes")
+        body = await asyncio.wait_for(reader.readexactly(length), BODY_TIMEOUT_SECONDS)
+        try:
+            return body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise HTTPError(400, "Body must be UTF-8 Markdown")
+
+    async def _respond(self, writer, status, body, content_type, headers=None):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+                "Connection: close"]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        # Stream the body in chunks, letting slow clients apply backpressure
+        for start in range(0, len(body), RESPONSE_CHUNK_SIZE):
+            writer.write(body[start:start + RESPONSE_CHUNK_SIZE])
+            await writer.drain()
+        await writer.drain()
+
+    async def _respond_json(self, writer, status, payload, headers=None):
+        await self._respond(writer, status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+
+    async def handle(self, reader, writer):
+        """Serve a single request on a connection."""
+        try:
+            try:
+                request = await self._read_request(reader)
+                if request is None:
+                    return
+                method, target, headers = request
+                url = urlsplit(target)
+
+                if url.path == '/health':
+                    if method != 'GET':
+                        raise HTTPError(405, "Use GET")
+                    await self._respond_json(writer, 200, {
+                        "status": "ok", "active": self.active, "queued": self.queued,
+                        "max_concurrency": self.max_concurrency, "max_queue": self.max_queue,
+                    })
+                elif url.path == '/convert':
+                    if method != 'POST':
+                        raise HTTPError(405, "Use POST")
+                    backend = parse_qs(url.query).get('backend', [self.backend])[0]
+                    if backend not in POOL_BACKENDS:
+                        raise HTTPError(400, f"Backend {backend!r} is not available, expected one of {POOL_BACKENDS}")
+                    markdown = await self._read_body(reader, headers)
+                    docx_bytes = await self.convert(markdown, backend)
+                    await self._respond(writer, 200, docx_bytes, DOCX_CONTENT_TYPE,
+                                        {'Content-Disposition': 'attachment; filename="document.docx"'})
+                else:
+                    raise HTTPError(404, f"No route for {url.path}")
+            except HTTPError as e:
+                await self._respond_json(writer, e.status, {"error": e.message}, e.headers)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                await self._respond_json(writer, 400, {"error": "Request timed out or was truncated"})
+            except Exception as e:
+                await self._respond_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        except (ConnectionError, asyncio.TimeoutError):
+            pass  # Client went away while we were responding
+        finally:
+            writer.close()
+
+async def serve(server, host='127.0.0.1', port=8000, unix_socket=None):
+    """Run the conversion server until SIGINT/SIGTERM."""
+    server.start_pool()
+    try:
+        if unix_socket:
+            listener = await asyncio.start_unix_server(server.handle, path=unix_socket)
+            print(f"Listening on unix:{unix_socket}")
+        else:
+            listener = await asyncio.start_server(server.handle, host, port)
+            bound = listener.sockets[0].getsockname()
+            print(f"Listening on http://{bound[0]}:{bound[1]}")
+        print(f"{server.workers} workers, {server.max_concurrency} concurrent conversions, queue of {server.max_queue}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on this platform; Ctrl+C still raises KeyboardInterrupt
+
+        async with listener:
+            await stop.wait()
+    finally:
+        server.shutdown()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve Markdown to DOCX conversions over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="TCP port (default: 8000, 0 picks a free port)")
+    parser.add_argument('--unix-socket', default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--max-concurrency', type=int, default=None, help="Conversions running at once (default: workers)")
+    parser.add_argument('--max-queue', type=int, default=64, help="Requests waiting for a slot before 503s (default: 64)")
+    parser.add_argument('--max-body-mb', type=float, default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+                        help="Largest accepted Markdown body in MB (default: 20)")
+    parser.add_argument('--backend', choices=POOL_BACKENDS, default='docx', help="Default conversion backend (default: docx)")
+    parser.add_argument('--image-root', default=None,
+                        help="Allow images below this directory; without it image references are not loaded")
+    parser.add_argument('--template', default=None, help=".docx or .dotx file providing the styles and page setup")
+    args = parser.parse_args()
+
+    conversion_server = ConversionServer(
+        workers=args.workers, max_concurrency=args.max_concurrency, max_queue=args.max_queue,
+        max_body_bytes=int(args.max_body_mb * 1024 * 1024), backend=args.backend, image_root=args.image_root,
+        template=args.template,
+    )
+    try:
+        asyncio.run(serve(conversion_server, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
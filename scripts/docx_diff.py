@@ -0,0 +1,362 @@
+"""
+Structural DOCX diff.
+
+Compares Word documents by structure rather than by bytes, to check that a
+converter change did not alter its output. Each body paragraph is reduced
+to a fingerprint of its style, its runs' text and formatting (bold, italic,
+underline, color and font; adjacent runs with the same formatting are
+merged first, so a different split into runs is not a difference) and the
+contents of its pictures, each table to its column and row count, and
+each table row to its cell texts. The two fingerprint sequences are aligned
+with difflib's SequenceMatcher, after the common prefix and suffix are
+taken off, and only the differing ranges are reported.
+
+Documents whose word/document.xml, word/styles.xml and pictures
+(word/media/) have the same CRCs and sizes in both zips are reported
+identical without being parsed.
+
+Two files give one JSON report:
+
+    {"a": ..., "b": ..., "identical": ..., "items": [n_a, n_b] or null,
+     "differences": [{"op": "replace"|"delete"|"insert", "a": [start, end], "b": [start, end],
+                      "before": [item, ...], "after": [item, ...], "changed": [[...], ...]}]}
+
+"items" holds the number of items of each document, or null when the
+documents were found identical by their CRCs and were not parsed.
+
+Two directories are compared file by file (matched by relative path)
+across a process pool, streaming JSON Lines: one record per file that is
+not identical, then a summary record.
+
+    {"type": "result", "path": ..., "status": "changed"|"only_in_a"|"only_in_b"|"error",
+     "differences": [...], "error": ...}
+    {"type": "summary", "files": ..., "identical": ..., "changed": ..., "only_in_a": ...,
+     "only_in_b": ..., "errors": ..., "wall_seconds": ...}
+
+Usage:
+    python scripts/docx_diff.py <a.docx> <b.docx> [--json PATH]
+    python scripts/docx_diff.py <dir_a> <dir_b> [--workers N] [--jsonl PATH]
+"""
+import difflib
+import hashlib
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from docx_inspect import iter_docx_body, read_relationship_targets, DOCUMENT_PART, STYLES_PART
+
+MEDIA_PREFIX = 'word/media/'
+
+# Text longer than this is cut short in reported items
+MAX_TEXT = 200
+
+# Picture digests are cut to this many hex digits in reported items
+IMAGE_DIGEST_LENGTH = 12
+
+def _flags(bold, italic, underline, color, font):
+    flags = [name for name, on in (('bold', bold), ('italic', italic), ('underline', underline)) if on]
+    if color:
+        flags.append('#' + color)
+    if font:
+        flags.append('font=' + font)
+    return ' '.join(flags)
+
+def _short(text):
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT] + '...'
+
+def _digest(value):
+    return hashlib.sha256(repr(value).encode('utf-8')).digest()
+
+class ImageDigests(object):
+    """SHA-256 digests of a package's pictures by relationship ID, each computed once."""
+
+    def __init__(self, package):
+        self.package = package
+        self.targets = read_relationship_targets(package)
+        self.digests = {}
+
+    def __call__(self, rid):
+        if rid not in self.digests:
+            try:
+                digest = hashlib.sha256(self.package.read(self.targets[rid])).hexdigest()
+            except KeyError:
+                digest = 'missing:' + str(rid)  # Dangling reference
+            self.digests[rid] = digest
+        return self.digests[rid]
+
+def iter_items(source):
+    """
+    Stream the comparable items of a DOCX: paragraphs, tables and table rows,
+    in document order.
+
+    Args:
+        source (str): Path of a .docx file
+
+    Yields:
+        tuple: (fingerprint, item) where item is a JSON-serializable summary:
+            {"kind": "paragraph", index, style, text, runs, images} with runs as
+            [text, formatting] pairs and images as picture digests,
+            {"kind": "table", index, columns, rows} or {"kind": "row", table, row, cells}
+    """
+    with zipfile.ZipFile(source) as package:
+        yield from _iter_items(source, ImageDigests(package))
+
+def _iter_items(source, image_digests):
+    for record in iter_docx_body(source):
+        if record["kind"] == "paragraph":
+            runs = []
+            for text, *formatting in record["runs"]:
+                if not text:
+                    continue
+                flags = _flags(*formatting)
+                if runs and runs[-1][1] == flags:
+                    runs[-1][0] += text
+                else:
+                    runs.append([text, flags])
+            images = [image_digests(rid) for rid in record["images"]]
+            fingerprint = _digest((record["style"], [tuple(run) for run in runs], images))
+            yield fingerprint, {"kind": "paragraph", "index": record["index"], "style": record["style"],
+                                "text": record["text"], "runs": runs, "images": images}
+        else:
+            rows = record["rows"]
+            columns = len(rows[0]) if rows else 0
+            yield _digest(("table", columns, len(rows))), {"kind": "table", "index": record["index"],
+                                                           "columns": columns, "rows": len(rows)}
+            for row_index, cells in enumerate(rows):
+                yield _digest(("row", cells)), {"kind": "row", "table": record["index"], "row": row_index,
+                                                "cells": cells}
+
+def _changes(before, after):
+    """Name what differs between two items of the same position."""
+    if before["kind"] != after["kind"]:
+        return ["kind"]
+    if before["kind"] != "paragraph":
+        return ["content"]
+    changed = []
+    if before["style"] != after["style"]:
+        changed.append("style")
+    if before["text"] != after["text"]:
+        changed.append("text")
+    # Runs that differ only because their text does are not a formatting change
+    if before["runs"] != after["runs"] and ("text" not in changed or
+                                            [flags for _, flags in before["runs"]] != [flags for _, flags in after["runs"]]):
+        changed.append("formatting")
+    if before["images"] != after["images"]:
+        changed.append("images")
+    return changed
+
+def _reported(item):
+    item = dict(item)
+    if item["kind"] == "paragraph":
+        item["text"] = _short(item["text"])
+        item["runs"] = [[_short(text), flags] for text, flags in item["runs"]]
+        item["images"] = [digest[:IMAGE_DIGEST_LENGTH] for digest in item["images"]]
+    elif item["kind"] == "row":
+        item["cells"] = [_short(cell) for cell in item["cells"]]
+    return item
+
+def diff_items(items_a, items_b):
+    """
+    Align two item sequences and describe the ranges that differ.
+
+    Args:
+        items_a, items_b (list): (fingerprint, item) pairs from iter_items
+
+    Returns:
+        list: Difference records, in document order
+    """
+    hashes_a = [fingerprint for fingerprint, _ in items_a]
+    hashes_b = [fingerprint for fingerprint, _ in items_b]
+    if hashes_a == hashes_b:
+        return []
+
+    # Converter changes tend to touch a few places; aligning only what lies between the common
+    # prefix and suffix keeps SequenceMatcher's work proportional to the changed region. Its
+    # autojunk heuristic keeps items repeated all over (empty paragraphs) from making it quadratic
+    prefix = 0
+    limit = min(len(hashes_a), len(hashes_b))
+    while prefix < limit and hashes_a[prefix] == hashes_b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and hashes_a[-1 - suffix] == hashes_b[-1 - suffix]:
+        suffix += 1
+
+    matcher = difflib.SequenceMatcher(None, hashes_a[prefix:len(hashes_a) - suffix],
+                                      hashes_b[prefix:len(hashes_b) - suffix])
+    differences = []
+    for op, a_start, a_end, b_start, b_end in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        a_start, a_end, b_start, b_end = a_start + prefix, a_end + prefix, b_start + prefix, b_end + prefix
+        before = [item for _, item in items_a[a_start:a_end]]
+        after = [item for _, item in items_b[b_start:b_end]]
+        difference = {"op": op, "a": [a_start, a_end], "b": [b_start, b_end],
+                      "before": [_reported(item) for item in before], "after": [_reported(item) for item in after]}
+        if op == 'replace' and len(before) == len(after):
+            difference["changed"] = [_changes(x, y) for x, y in zip(before, after)]
+        differences.append(difference)
+    return differences
+
+def same_parts(path_a, path_b):
+    """
+    Whether both documents have byte-identical body, styles and picture
+    parts, judged by the zips' CRCs and sizes.
+    """
+    with zipfile.ZipFile(path_a) as package_a, zipfile.ZipFile(path_b) as package_b:
+        media_a = {name for name in package_a.namelist() if name.startswith(MEDIA_PREFIX)}
+        media_b = {name for name in package_b.namelist() if name.startswith(MEDIA_PREFIX)}
+        if media_a != media_b:
+            return False
+        for name in (DOCUMENT_PART, STYLES_PART, *sorted(media_a)):
+            try:
+                info_a, info_b = package_a.getinfo(name), package_b.getinfo(name)
+            except KeyError:
+                return False
+            if (info_a.CRC, info_a.file_size) != (info_b.CRC, info_b.file_size):
+                return False
+    return True
+
+def diff_docx(path_a, path_b):
+    """
+    Compare two DOCX files.
+
+    Returns:
+        dict: The report, see the module docstring; "items" is None when
+            the documents were not parsed because same_parts holds
+    """
+    if same_parts(path_a, path_b):
+        return {"a": path_a, "b": path_b, "identical": True, "items": None, "differences": []}
+    items_a = list(iter_items(path_a))
+    items_b = list(iter_items(path_b))
+    differences = diff_items(items_a, items_b)
+    return {"a": path_a, "b": path_b, "identical": not differences, "items": [len(items_a), len(items_b)],
+            "differences": differences}
+
+def find_docx_files(directory):
+    """Relative paths of the .docx files under a directory, sorted."""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith('.docx') and not name.startswith('~$'):
+                paths.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(paths)
+
+def diff_one(job):
+    """
+    Compare one pair of files of two trees. Runs inside a worker process and
+    never raises; failures are reported in the returned result.
+
+    Args:
+        job (tuple): (relative path, dir_a, dir_b)
+
+    Returns:
+        dict: Result record, with status "identical" for files that did not change
+    """
+    path, dir_a, dir_b = job
+    result = {"type": "result", "path": path, "status": "error", "differences": [], "error": None}
+    try:
+        report = diff_docx(os.path.join(dir_a, path), os.path.join(dir_b, path))
+        result["status"] = "identical" if report["identical"] else "changed"
+        result["differences"] = report["differences"]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+def diff_trees(dir_a, dir_b, out=None, workers=None):
+    """
+    Compare the .docx files of two directory trees across a process pool.
+
+    Args:
+        dir_a, dir_b (str): The trees, e.g. golden and new converter output
+        out (file, optional): Text stream receiving one JSON line per file
+            that is not identical, as it completes, then the summary line
+        workers (int, optional): Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        tuple: (results, summary) - the records of the files that are not identical, and the summary record
+    """
+    start = time.perf_counter()
+    files_a, files_b = set(find_docx_files(dir_a)), set(find_docx_files(dir_b))
+    results = [{"type": "result", "path": path, "status": "only_in_a", "differences": [], "error": None}
+               for path in sorted(files_a - files_b)]
+    results += [{"type": "result", "path": path, "status": "only_in_b", "differences": [], "error": None}
+                for path in sorted(files_b - files_a)]
+    if out is not None:
+        for result in results:
+            out.write(json.dumps(result) + '\n')
+
+    jobs = [(path, dir_a, dir_b) for path in sorted(files_a & files_b)]
+    identical = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(diff_one, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["status"] == "identical":
+                    identical += 1
+                    continue
+                results.append(result)
+                if out is not None:
+                    out.write(json.dumps(result) + '\n')
+                    out.flush()
+
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("changed", "only_in_a", "only_in_b", "error")}
+    summary = {
+        "type": "summary",
+        "files": len(files_a | files_b),
+        "identical": identical,
+        "changed": counts["changed"],
+        "only_in_a": counts["only_in_a"],
+        "only_in_b": counts["only_in_b"],
+        "errors": counts["error"],
+        "wall_seconds": round(time.perf_counter() - start, 6),
+    }
+    if out is not None:
+        out.write(json.dumps(summary) + '\n')
+        out.flush()
+    return results, summary
+
+def main(argv=None, prog=None):
+    """Command-line interface of docx_diff.py (argv defaults to sys.argv[1:]); returns the exit status."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=prog, description="Compare Word documents, or trees of them, by structure.")
+    parser.add_argument('a', help="DOCX file or directory (e.g. the golden output)")
+    parser.add_argument('b', help="DOCX file or directory to compare with it")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of worker processes when comparing directories (default: CPU count)")
+    parser.add_argument('--json', '--jsonl', dest='out', default='-', metavar='PATH',
+                        help="Write the report (JSON Lines for directories) here (default: - for stdout)")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.a) != os.path.isdir(args.b):
+        parser.error("compare two files or two directories")
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', encoding='utf-8')
+    try:
+        if os.path.isdir(args.a):
+            results, summary = diff_trees(args.a, args.b, out, workers=args.workers)
+        else:
+            report = diff_docx(args.a, args.b)
+            out.write(json.dumps(report, indent=2) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if os.path.isdir(args.a):
+        print(f"\nCompared {summary['files']} files in {summary['wall_seconds']:.2f}s: {summary['identical']} identical, "
+              f"{summary['changed']} changed, {summary['only_in_a']} only in {args.a}, "
+              f"{summary['only_in_b']} only in {args.b}, {summary['errors']} errors", file=sys.stderr)
+        return 0 if summary["identical"] == summary["files"] else 1
+    if report["identical"]:
+        print("✓ No structural differences", file=sys.stderr)
+    else:
+        print(f"✗ {len(report['differences'])} differing ranges", file=sys.stderr)
+    return 0 if report["identical"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
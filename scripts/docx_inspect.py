@@ -0,0 +1,294 @@
+"""
+Single-pass DOCX inspection engine.
+
+Streams word/document.xml with lxml's iterparse and yields one compact
+record per body-level paragraph and table, releasing each element once it
+has been read so memory stays flat regardless of document length. The
+records follow python-docx's reading rules (style names, run text, toggle
+properties, cell text), so tools built on them report the same thing as
+tools walking the python-docx object model.
+
+inspect_docx() folds the records into the structural summary used by
+validate_md_to_docx; test_docx_format prints the records themselves.
+"""
+import posixpath
+import zipfile
+
+from lxml import etree
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+def _w(tag):
+    return f'{{{W_NS}}}{tag}'
+
+W_BODY = _w('body')
+W_P = _w('p')
+W_TBL = _w('tbl')
+W_TR = _w('tr')
+W_TC = _w('tc')
+W_R = _w('r')
+W_HYPERLINK = _w('hyperlink')
+W_VAL = _w('val')
+W_DRAWING = _w('drawing')
+A_BLIP = '{http://schemas.openxmlformats.org/drawingml/2006/main}blip'
+R_EMBED = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed'
+PR_RELATIONSHIP = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+DOCUMENT_PART = 'word/document.xml'
+DOCUMENT_RELS_PART = 'word/_rels/document.xml.rels'
+STYLES_PART = 'word/styles.xml'
+
+# Built-in styles whose styles.xml names differ from their UI names (as in python-docx)
+UI_STYLE_NAMES = {'caption': 'Caption', 'footer': 'Footer', 'header': 'Header'}
+UI_STYLE_NAMES.update({f'heading {level}': f'Heading {level}' for level in range(1, 10)})
+
+LIST_TYPES = {
+    'List Bullet': 'Bulleted',
+    'List Number': 'Numbered',
+    'List Bullet 2': 'Nested Bulleted',
+}
+
+# Run content elements and the text python-docx renders for them
+RUN_CONTENT_TEXT = {
+    _w('tab'): '\t',
+    _w('ptab'): '\t',
+    _w('cr'): '\n',
+    _w('noBreakHyphen'): '-',
+}
+
+def read_paragraph_styles(package):
+    """
+    Map paragraph styleIds to their UI names.
+
+    Returns:
+        tuple: (dict of styleId -> name, name of the default paragraph style)
+    """
+    names = {}
+    default_name = 'Normal'
+    if STYLES_PART not in package.namelist():
+        return names, default_name
+    styles = etree.fromstring(package.read(STYLES_PART))
+    for style in styles.iterchildren(_w('style')):
+        if style.get(_w('type')) != 'paragraph':
+            continue
+        name_el = style.find(_w('name'))
+        name = name_el.get(W_VAL) if name_el is not None else None
+        name = UI_STYLE_NAMES.get(name, name)
+        names[style.get(_w('styleId'))] = name
+        if style.get(_w('default')) in ('1', 'true', 'on'):
+            default_name = name
+    return names, default_name
+
+def _toggle(rPr, tag):
+    """Read an on/off run property: True, False, or None when not set directly."""
+    if rPr is None:
+        return None
+    el = rPr.find(_w(tag))
+    if el is None:
+        return None
+    return el.get(W_VAL) not in ('0', 'false', 'off')
+
+def _underline(rPr):
+    el = rPr.find(_w('u')) if rPr is not None else None
+    if el is None or el.get(W_VAL) is None:
+        return None
+    return el.get(W_VAL) != 'none'
+
+def _font(rPr):
+    el = rPr.find(_w('rFonts')) if rPr is not None else None
+    return el.get(_w('ascii')) if el is not None else None
+
+def _color(rPr):
+    el = rPr.find(_w('color')) if rPr is not None else None
+    if el is None or el.get(W_VAL) in (None, 'auto'):
+        return None
+    return el.get(W_VAL).upper()
+
+def run_text(r):
+    parts = []
+    for child in r:
+        if child.tag == _w('t'):
+            parts.append(child.text or '')
+        elif child.tag == _w('br'):
+            if child.get(_w('type'), 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif child.tag in RUN_CONTENT_TEXT:
+            parts.append(RUN_CONTENT_TEXT[child.tag])
+    return ''.join(parts)
+
+def paragraph_text(p):
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(run_text(r) for r in child.iterchildren(W_R))
+    return ''.join(parts)
+
+def _paragraph_record(p, index, style_names, default_style):
+    pPr = p.find(_w('pPr'))
+    pStyle = pPr.find(_w('pStyle')) if pPr is not None else None
+    style_id = pStyle.get(W_VAL) if pStyle is not None else None
+    style = style_names.get(style_id, default_style) if style_id else default_style
+
+    runs = []
+    images = []
+    for r in p.iterchildren(W_R):
+        rPr = r.find(_w('rPr'))
+        runs.append((run_text(r), _toggle(rPr, 'b'), _toggle(rPr, 'i'), _underline(rPr), _color(rPr), _font(rPr)))
+        if r.find(W_DRAWING) is not None:
+            images.extend(blip.get(R_EMBED) for blip in r.iter(A_BLIP))
+
+    return {
+        "kind": "paragraph",
+        "index": index,
+        "style": style,
+        "text": paragraph_text(p),
+        "bold": any(run[1] for run in runs),
+        "italic": any(run[2] for run in runs),
+        "underline": any(run[3] for run in runs),
+        "color": runs[0][4] if runs else None,
+        "bold_runs": [run[0].strip() for run in runs if run[1] and run[0].strip()],
+        "runs": runs,
+        "images": images,
+    }
+
+def _table_record(tbl, index):
+    rows = []
+    for tr in tbl.iterchildren(W_TR):
+        row = []
+        for tc in tr.iterchildren(W_TC):
+            tcPr = tc.find(_w('tcPr'))
+            span_el = tcPr.find(_w('gridSpan')) if tcPr is not None else None
+            merge_el = tcPr.find(_w('vMerge')) if tcPr is not None else None
+            span = int(span_el.get(W_VAL, '1')) if span_el is not None else 1
+
+            column = len(row)
+            if merge_el is not None and merge_el.get(W_VAL, 'continue') == 'continue' and rows and column < len(rows[-1]):
+                # Vertically merged: python-docx reports the cell above
+                text = rows[-1][column]
+            else:
+                text = '\n'.join(paragraph_text(p) for p in tc.iterchildren(W_P))
+            row.extend([text] * span)
+        rows.append(row)
+    return {"kind": "table", "index": index, "rows": rows}
+
+def read_relationship_targets(package, rels_part=DOCUMENT_RELS_PART):
+    """
+    Map the relationship IDs of the main document to their targets.
+
+    Returns:
+        dict: rId -> part name within the package (e.g. word/media/image1.png),
+            or the target URL of external relationships
+    """
+    if rels_part not in package.namelist():
+        return {}
+    targets = {}
+    for rel in etree.fromstring(package.read(rels_part)).iterchildren(PR_RELATIONSHIP):
+        target = rel.get('Target')
+        if rel.get('TargetMode') != 'External':
+            target = target.lstrip('/') if target.startswith('/') else posixpath.normpath('word/' + target)
+        targets[rel.get('Id')] = target
+    return targets
+
+def iter_docx_body(source):
+    """
+    Stream the body of a DOCX file as paragraph and table records.
+
+    Args:
+        source (str or file): Path or binary file object (e.g. BytesIO) of a .docx file
+
+    Yields:
+        dict: {"kind": "paragraph", index, style, text, bold, italic,
+               underline, color, bold_runs, runs, images} or {"kind": "table", index, rows}
+               in document order; runs are (text, bold, italic, underline,
+               color, font) tuples with None for properties that are not set,
+               images the relationship IDs of the paragraph's pictures
+    """
+    with zipfile.ZipFile(source) as package:
+        style_names, default_style = read_paragraph_styles(package)
+        paragraph_index = 0
+        table_index = 0
+        with package.open(DOCUMENT_PART) as document_xml:
+            for _, elem in etree.iterparse(document_xml, events=('end',), tag=(W_P, W_TBL)):
+                parent = elem.getparent()
+                if parent is None or parent.tag != W_BODY:
+                    continue  # Paragraphs inside tables are read with their table
+
+                if elem.tag == W_P:
+                    yield _paragraph_record(elem, paragraph_index, style_names, default_style)
+                    paragraph_index += 1
+                else:
+                    yield _table_record(elem, table_index)
+                    table_index += 1
+
+                # Release everything read so far
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+def inspect_docx(source, visitor=None):
+    """
+    Build a structural summary of a DOCX file in a single streaming pass.
+
+    Args:
+        source (str or file): Path or binary file object of a .docx file
+        visitor (callable, optional): Called with every body record as it is
+            read, so callers can report details without a second pass
+
+    Returns:
+        dict: Summary with headings [(text, level)], lists (list style per
+            list paragraph), list_kinds (count per list style), styles,
+            bold_text, colors (count per run color of colored paragraphs),
+            tables (rows of cell text), links, code_blocks and paragraph_count
+    """
+    format_info = {
+        "headings": [],
+        "lists": [],
+        "list_kinds": {},
+        "styles": set(),
+        "bold_text": [],
+        "colors": {},
+        "tables": [],
+        "links": [],
+        "code_blocks": [],
+        "paragraph_count": 0,
+    }
+
+    for record in iter_docx_body(source):
+        if visitor is not None:
+            visitor(record)
+
+        if record["kind"] == "table":
+            format_info["tables"].append(record["rows"])
+            continue
+
+        format_info["paragraph_count"] += 1
+        style = record["style"]
+        text = record["text"].strip()
+
+        # Skip empty paragraphs
+        if not text:
+            continue
+
+        format_info["styles"].add(style)
+
+        if style.startswith('Heading'):
+            level = int(style.split()[-1]) if style.split()[-1].isdigit() else 0
+            format_info["headings"].append((text, level))
+
+        if style in LIST_TYPES:
+            format_info["lists"].append(style)
+            format_info["list_kinds"][style] = format_info["list_kinds"].get(style, 0) + 1
+
+        format_info["bold_text"].extend(record["bold_runs"])
+
+        if record["color"]:
+            format_info["colors"][record["color"]] = format_info["colors"].get(record["color"], 0) + 1
+
+        if style == 'CodeBlock':
+            format_info["code_blocks"].append(text)
+
+    # Convert set to list for JSON serialization
+    format_info["styles"] = list(format_info["styles"])
+    return format_info
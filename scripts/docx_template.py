@@ -0,0 +1,151 @@
+"""
+Reusable document templates.
+
+Preparing a document is a fixed cost paid before the first paragraph is
+written: python-docx unzips and parses the template, and the converter
+probes and adds the styles it relies on. A DocumentTemplate does that
+once per process and then hands out clones, built by copying the parsed
+XML of each part instead of re-reading the package. Every part is copied,
+styles included, so changes to one document never show up in the next.
+
+Templates can be any .docx or .dotx file; their styles, numbering, theme
+and page setup are kept and their body content is dropped.
+"""
+import copy
+import hashlib
+import io
+import os
+import zipfile
+
+import docx.shared
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.part import XmlPart
+from docx.shared import Inches
+
+CONTENT_TYPES_PART = '[Content_Types].xml'
+DOCUMENT_MAIN_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml'
+TEMPLATE_MAIN_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml'
+
+def read_template_bytes(template_path):
+    """
+    Read a .docx or .dotx file, relabelling a template's main part as a
+    document so that python-docx will open it.
+
+    Returns:
+        bytes: The package
+    """
+    with open(template_path, 'rb') as f:
+        data = f.read()
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        content_types = package.read(CONTENT_TYPES_PART).decode('utf-8')
+        if TEMPLATE_MAIN_TYPE not in content_types:
+            return data
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as relabelled:
+            for item in package.infolist():
+                if item.filename == CONTENT_TYPES_PART:
+                    relabelled.writestr(item, content_types.replace(TEMPLATE_MAIN_TYPE, DOCUMENT_MAIN_TYPE))
+                else:
+                    relabelled.writestr(item, package.read(item.filename))
+    return out.getvalue()
+
+def clear_body(doc):
+    """Remove all body content, keeping the final section properties."""
+    body = doc.element.body
+    for child in list(body):
+        if not child.tag.endswith('}sectPr'):
+            body.remove(child)
+
+def add_converter_styles(doc):
+    """Add the styles the converter relies on if the template lacks them."""
+    # Add a style for code blocks if it doesn't exist
+    if 'CodeBlock' not in doc.styles:
+        code_block_style = doc.styles.add_style('CodeBlock', WD_STYLE_TYPE.PARAGRAPH)
+        code_block_style.font.name = 'Courier New'
+        code_block_style.font.size = docx.shared.Pt(10)
+
+    # Add a style for List Bullet 2 if it doesn't exist
+    if 'List Bullet 2' not in doc.styles:
+        list_bullet_2_style = doc.styles.add_style('List Bullet 2', WD_STYLE_TYPE.PARAGRAPH)
+        list_bullet_2_style.paragraph_format.left_indent = Inches(0.5)
+
+class DocumentTemplate(object):
+    """
+    A template prepared once and cloned for every conversion.
+
+    Args:
+        template_path (str, optional): .docx or .dotx file providing styles,
+            numbering, theme and page setup. Defaults to python-docx's
+            default template.
+    """
+
+    def __init__(self, template_path=None):
+        self.template_path = template_path
+        if template_path:
+            data = read_template_bytes(template_path)
+            self.fingerprint = hashlib.sha256(data).hexdigest()
+            self._document = Document(io.BytesIO(data))
+        else:
+            self.fingerprint = 'default'
+            self._document = Document()
+        clear_body(self._document)
+        add_converter_styles(self._document)
+        self._parts = None
+
+    def new_document(self):
+        """
+        Return an empty document with the template's styles and setup.
+        Each call builds a fresh package from the template's parsed parts.
+        """
+        source = self._document.part.package
+        package = type(source)()
+        clones = {}
+        for part in source.iter_parts():
+            if isinstance(part, XmlPart):
+                clones[part.partname] = type(part)(part.partname, part.content_type, copy.deepcopy(part.element), package)
+            else:
+                clones[part.partname] = type(part).load(part.partname, part.content_type, part.blob, package)
+
+        for rel in source.rels.values():
+            package.load_rel(rel.reltype, clones[rel.target_part.partname], rel.rId)
+        for part in source.iter_parts():
+            for rel in part.rels.values():
+                target = rel.target_ref if rel.is_external else clones[rel.target_part.partname]
+                clones[part.partname].load_rel(rel.reltype, target, rel.rId, rel.is_external)
+
+        for part in clones.values():
+            part.after_unmarshal()
+        package.after_unmarshal()
+        return package.main_document_part.document
+
+    def package_parts(self):
+        """Return the template package as a dict of part name -> bytes, for writers that build the zip themselves."""
+        if self._parts is None:
+            buffer = io.BytesIO()
+            self._document.save(buffer)
+            with zipfile.ZipFile(buffer) as package:
+                self._parts = {name: package.read(name) for name in package.namelist()}
+        return self._parts
+
+# Prepared templates of this process, keyed by path and modification time
+_templates = {}
+
+def get_template(template_path=None):
+    """
+    Return the DocumentTemplate for template_path, preparing it on first
+    use and reusing it for as long as the file is unchanged.
+
+    Args:
+        template_path (str, optional): .docx or .dotx file; None for the default template
+
+    Returns:
+        DocumentTemplate: The prepared template
+    """
+    if template_path:
+        key = (os.path.abspath(template_path), os.stat(template_path).st_mtime_ns)
+    else:
+        key = None
+    if key not in _templates:
+        _templates[key] = DocumentTemplate(template_path)
+    return _templates[key]
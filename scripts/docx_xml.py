@@ -0,0 +1,98 @@
+"""
+WordprocessingML serialization helpers.
+
+Builds w:r, w:p and related markup as strings, for code that writes body
+XML in bulk instead of going through python-docx's proxy objects (the fast
+backend and the table engine). The markup matches what python-docx
+produces for the same content.
+"""
+import re
+from xml.sax.saxutils import escape
+
+from md_inline import iter_inline_spans, PLAIN, BOLD, ITALIC, BOLD_ITALIC, CODE_SPAN, LINK
+
+# Characters that are not allowed in XML 1.0 documents
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+RUN_BREAKS = re.compile(r'(\r\n|\n|\r|\t)')
+
+
+def xml_text(text):
+    """Escape text for use as element content."""
+    return escape(INVALID_XML_CHARS.sub('', text))
+
+
+def xml_attr(text):
+    """Escape text for use inside a double-quoted attribute value."""
+    return escape(INVALID_XML_CHARS.sub('', text), {'"': '&quot;'})
+
+
+def run_properties_xml(bold=False, italic=False, color=None, underline=False, font=None):
+    """Serialize a w:rPr element, or return '' when no property is set."""
+    props = []
+    if font:
+        props.append(f'<w:rFonts w:ascii="{font}" w:hAnsi="{font}"/>')
+    if bold:
+        props.append('<w:b/>')
+    if italic:
+        props.append('<w:i/>')
+    if color:
+        props.append(f'<w:color w:val="{color}"/>')
+    if underline:
+        props.append('<w:u w:val="single"/>')
+    return '<w:rPr>' + ''.join(props) + '</w:rPr>' if props else ''
+
+
+def _run(text, properties):
+    if '\n' not in text and '\r' not in text and '\t' not in text:
+        return f'<w:r>{properties}<w:t xml:space="preserve">{xml_text(text)}</w:t></w:r>' if text else f'<w:r>{properties}</w:r>'
+
+    parts = ['<w:r>', properties]
+    for piece in RUN_BREAKS.split(text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\n', '\r', '\r\n'):
+            parts.append('<w:br/>')
+        elif piece:
+            parts.append(f'<w:t xml:space="preserve">{xml_text(piece)}</w:t>')
+    parts.append('</w:r>')
+    return ''.join(parts)
+
+
+def run_xml(text, bold=False, italic=False, color=None, underline=False, font=None):
+    """
+    Serialize a single w:r element. Newlines become w:br and tabs become
+    w:tab, matching what python-docx does for run text.
+    """
+    return _run(text, run_properties_xml(bold, italic, color, underline, font))
+
+
+# Serialized run properties for each inline span kind (see add_formatted_text)
+SPAN_RUN_PROPERTIES = {
+    PLAIN: '',
+    BOLD: run_properties_xml(bold=True),
+    ITALIC: run_properties_xml(italic=True),
+    BOLD_ITALIC: run_properties_xml(bold=True, italic=True),
+    CODE_SPAN: run_properties_xml(font='Courier New'),
+    LINK: run_properties_xml(color='0000FF', underline=True),
+}
+
+
+def inline_runs_xml(text):
+    """Serialize markdown inline text as runs, one per inline span."""
+    return ''.join(_run(span_text, SPAN_RUN_PROPERTIES[kind])
+                   for kind, span_text, _ in iter_inline_spans(text))
+
+
+def paragraph_properties_xml(style_id=None, align=None):
+    """Serialize a w:pPr element, or return '' when no property is set."""
+    props = ''
+    if style_id:
+        props += f'<w:pStyle w:val="{style_id}"/>'
+    if align:
+        props += f'<w:jc w:val="{align}"/>'
+    return f'<w:pPr>{props}</w:pPr>' if props else ''
+
+
+def paragraph_xml(runs, style_id=None, align=None):
+    """Serialize a w:p element from already serialized runs."""
+    return f'<w:p>{paragraph_properties_xml(style_id, align)}{runs}</w:p>'
@@ -1,234 +1,398 @@
-from docx import Document
-import re
+import io
+import sys
+import time
 import docx.shared
-from docx.enum.style import WD_STYLE_TYPE
 from docx.shared import Inches
+from conversion_profile import BlockEmitters, build_blocks
+from docx_template import get_template
+from html_writer import write_html
+from md_blocks import iter_blocks
+from md_inline import iter_inline_spans, BOLD, ITALIC, BOLD_ITALIC, CODE_SPAN, LINK
+from table_engine import add_table
+from text_writer import write_text
 
-def generate_word_from_md(md_file_path, output_file_path):
-    # Read the markdown file
+BACKENDS = ('docx', 'fast', 'chunked', 'parallel')
+# Backends that may run inside another process pool (batch and server workers); 'parallel'
+# starts a pool of its own per document, which the outer pool's size would not bound
+POOL_BACKENDS = tuple(backend for backend in BACKENDS if backend != 'parallel')
+
+# Renderers of the output formats besides DOCX, each called as renderer(blocks, dst, images=None, hook=None)
+RENDERERS = {
+    'html': write_html,
+    'text': write_text,
+}
+FORMATS = ('docx',) + tuple(RENDERERS)
+FORMAT_EXTENSIONS = {'docx': '.docx', 'html': '.html', 'text': '.txt'}
+
+# Bump whenever a change alters the generated documents, so build caches are invalidated
+CONVERTER_VERSION = '6'
+
+def cache_key_for(cache, md_file_path, backend='docx', images=None, template=None):
+    """
+    Build cache key covering the source, its images, the converter version and the styles in use.
+    Without images, the key is that of the default ImagePipeline the document would be built with.
+    """
+    from image_cache import DEFAULT_TARGET_DPI
+    image_dpi = images.target_dpi if images is not None else DEFAULT_TARGET_DPI
+    return cache.key_for(md_file_path, CONVERTER_VERSION, backend, docx.__version__, image_dpi,
+                         get_template(template).fingerprint)
+
+def generate_word_from_md(md_file_path, output_file_path, backend='docx', cache=None, images=None, template=None,
+                          hook=None, also=None):
+    """
+    Convert a Markdown file to a Word document.
+
+    Args:
+        md_file_path (str): Path to the Markdown file
+        output_file_path (str): Path of the DOCX file to write
+        backend (str): Conversion backend, one of BACKENDS
+        cache (BuildCache, optional): Build cache; when the source, its images
+            and the converter are unchanged the cached document is reused
+        images (ImagePipeline, optional): Image loader to use, e.g. one with a
+            disk cache of downsampled images
+        template (str, optional): .docx or .dotx file whose styles and page
+            setup are used instead of the default template
+        hook (callable, optional): Instrumentation hook, see conversion_profile
+        also (dict, optional): Other renderings to write from the same parse,
+            as format (see RENDERERS) -> output path
+
+    Returns:
+        bool: True if the document was built, False if it came from the cache
+    """
+    also = also or {}
+    restored = False
+    if cache is not None:
+        key = cache_key_for(cache, md_file_path, backend, images, template)
+        restored = cache.restore(key, output_file_path)
+        if restored:
+            print(f"Document up to date (cached): {output_file_path}")
+            if not also:
+                return False
+
+    outputs = dict(also) if restored else dict(also, docx=output_file_path)
+    # Stream the markdown file line by line instead of reading it all at once
     with open(md_file_path, 'r', encoding='utf-8') as md_file:
-        lines = md_file.readlines()
-
-    # Create a new Word document
-    doc = Document()
-    
-    # Add a style for code blocks if it doesn't exist
-    if 'CodeBlock' not in doc.styles:
-        code_block_style = doc.styles.add_style('CodeBlock', WD_STYLE_TYPE.PARAGRAPH)
-        code_block_style.font.name = 'Courier New'
-        code_block_style.font.size = docx.shared.Pt(10)
-
-    # Add a style for List Bullet 2 if it doesn't exist
-    if 'List Bullet 2' not in doc.styles:
-        list_bullet_2_style = doc.styles.add_style('List Bullet 2', WD_STYLE_TYPE.PARAGRAPH)
-        list_bullet_2_style.paragraph_format.left_indent = Inches(0.5)
-    
-    # Add a title style for the name
-    is_first_line = True
-    in_list = False
-    
-    # Parse the markdown content and add it to the Word document
-    for line in lines:
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
-            continue
-            
-        # Detect section headings (bold text at start of line)
-        if line.startswith('**') and line.endswith('**') and not line.startswith('* **'):
-            # This is a section heading
-            heading_text = line.strip('**')
-            if is_first_line:
-                # First line is the name - make it Heading 1
-                doc.add_heading(heading_text, level=1)
-                is_first_line = False
-            else:
-                # Other section headings - make them Heading 2
-                doc.add_heading(heading_text, level=2)
-        
-        # Handle lists (bulleted and numbered)
-        elif line.startswith(('*', '1.', '   *')):
-            if line.startswith('*   '):
-                text = process_markdown_formatting(line[4:].strip())
-                doc.add_paragraph(text, style='List Bullet')
-            elif line.startswith('* '):
-                text = process_markdown_formatting(line[2:].strip())
-                doc.add_paragraph(text, style='List Bullet')
-            elif re.match(r'\d+\. ', line):
-                text = process_markdown_formatting(line[line.index('.') + 1:].strip())
-                doc.add_paragraph(text, style='List Number')
-            elif line.startswith('    *   ') or line.startswith('    * '):
-                text = process_markdown_formatting(line.strip('    * ').strip())
-                p = doc.add_paragraph(text, style='List Bullet 2')
-            in_list = True
-
-        # Handle code blocks
-        elif line.startswith('```'):
-            # Extract code language if specified
-            language = line[3:].strip() or None
-            
-            # Read until the end of the code block
-            code_block = []
-            for code_line in lines[lines.index(line) + 1:]:
-                if code_line.strip() == '```':
-                    break
-                code_block.append(code_line.rstrip())
-            
-            # Add the code block to the document
-            paragraph = doc.add_paragraph('\n'.join(code_block), style='CodeBlock')
-            
-            # Skip the code block lines in the main loop
-            lines = lines[:lines.index(line) + 1 + len(code_block) + 1] + lines[lines.index(line) + 1 + len(code_block) + 1:]
-            
-            continue
-        
-        # Handle images
-        elif line.startswith('!['):
-            # Extract alt text and image path
-            alt_text = line[line.index('[') + 1:line.index(']')]
-            image_path = line[line.index('(') + 1:line.index(')')]
-            
-            # Add the image to the document
-            try:
-                doc.add_picture(image_path, width=Inches(6.0))  # Adjust width as needed
-            except Exception as e:
-                print(f"Error adding image {image_path}: {e}")
-                paragraph = doc.add_paragraph(f"Image: {alt_text} - {image_path} (Error)")
-            
-            continue
-        
-        # Handle tables
-        elif '|' in line:
-            # Detect the table header and separator
-            if lines.index(line) + 1 < len(lines) and '---' in lines[lines.index(line) + 1]:
-                # Extract the table headers
-                header_line = line.strip()
-                headers = [h.strip() for h in header_line.split('|') if h.strip()]
-                
-                # Extract the table data
-                data_lines = []
-                for table_line in lines[lines.index(line) + 2:]:
-                    if '|' not in table_line:
-                        break
-                    data_lines.append(table_line.strip())
-                
-                # Create the table in the document
-                table = doc.add_table(rows=1, cols=len(headers))
-                table.style = 'Table Grid'
-                
-                # Add the headers to the table
-                header_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    header_cells[i].text = header
-                
-                # Add the data to the table
-                for data_line in data_lines:
-                    data = [d.strip() for d in data_line.split('|') if d.strip()]
-                    row_cells = table.add_row().cells
-                    for i, cell_data in enumerate(data):
-                        if i < len(row_cells):
-                            row_cells[i].text = cell_data
-                
-                # Skip the table lines in the main loop
-                lines = lines[:lines.index(line) + 1 + len(data_lines) + 1] + lines[lines.index(line) + 1 + len(data_lines) + 1:]
-                
-                continue
-        
-        # Handle markdown links
-        elif '[' in line and '](' in line and ')' in line:
-            # Extract all links in the line
-            current_pos = 0
-            paragraph = doc.add_paragraph()
-            
-            while current_pos < len(line):
-                link_start = line.find('[', current_pos)
-                
-                # If no more links, add the rest of the text
-                if link_start == -1:
-                    if current_pos < len(line):
-                        remaining_text = line[current_pos:]
-                        # Process any markdown formatting in the remaining text
-                        add_formatted_text(paragraph, remaining_text)
-                    break
-                    
-                # Add text before the link
-                if link_start > current_pos:
-                    before_link_text = line[current_pos:link_start]
-                    # Process any markdown formatting in text before the link
-                    add_formatted_text(paragraph, before_link_text)
-                
-                # Extract link text and URL
-                text_start = link_start + 1
-                text_end = line.find(']', text_start)
-                url_start = text_end + 2  # Skip ']('
-                url_end = line.find(')', url_start)
-                
-                if text_end == -1 or url_end == -1:
-                    # Malformed link, just add as text
-                    remaining_text = line[current_pos:]
-                    # Process any markdown formatting in the remaining text
-                    add_formatted_text(paragraph, remaining_text)
-                    break
-                
-                link_text = line[text_start:text_end]
-                url = line[url_start:url_end]
-                
-                # Add link as blue, underlined text
-                run = paragraph.add_run(link_text)
-                run.font.color.rgb = docx.shared.RGBColor(0, 0, 255)
-                run.underline = True
-                
-                # Move current position past this link
-                current_pos = url_end + 1
-            
-            in_list = False
-        else:
-            # Regular paragraph with possible markdown formatting
-            paragraph = doc.add_paragraph()
-            add_formatted_text(paragraph, line)
-            in_list = False
-
-    # Save the Word document
-    doc.save(output_file_path)
+        convert_to_formats(md_file, outputs, backend=backend, images=images, template=template, hook=hook)
+
+    for output_format, path in also.items():
+        print(f"{output_format.upper()} rendering created: {path}")
+    if restored:
+        return False
+    if cache is not None:
+        cache.store(key, output_file_path, source=md_file_path)
     print(f"Document successfully created: {output_file_path}")
+    return True
+
+def generate_docx_bytes(md_file_path, backend='docx', images=None, template=None):
+    """
+    Convert a Markdown file to a DOCX held in memory.
+
+    Args:
+        md_file_path (str): Path to the Markdown file
+        backend (str): Conversion backend, one of BACKENDS
+        images (ImagePipeline, optional): Image loader to use
+        template (str, optional): .docx or .dotx template file
+
+    Returns:
+        BytesIO: The .docx package, positioned at the start
+    """
+    buffer = io.BytesIO()
+    with open(md_file_path, 'r', encoding='utf-8') as md_file:
+        convert_stream(md_file, buffer, backend=backend, images=images, template=template)
+    buffer.seek(0)
+    return buffer
+
+def open_build_cache(cache_dir, max_mb=None, max_age_days=None):
+    """Create a BuildCache from command-line style size (MB) and age (days) limits."""
+    from build_cache import BuildCache, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE_SECONDS
+    return BuildCache(
+        cache_dir,
+        max_bytes=int(max_mb * 1024 * 1024) if max_mb is not None else DEFAULT_MAX_BYTES,
+        max_age_seconds=max_age_days * 24 * 3600 if max_age_days is not None else DEFAULT_MAX_AGE_SECONDS,
+    )
+
+def open_image_pipeline(cache_dir=None, dpi=None):
+    """Create an ImagePipeline from command-line style options."""
+    from image_cache import ImagePipeline, DEFAULT_TARGET_DPI
+    return ImagePipeline(cache_dir, target_dpi=dpi or DEFAULT_TARGET_DPI)
+
+def convert_stream(src, dst, backend='docx', images=None, template=None, hook=None):
+    """
+    Convert Markdown from any iterable of lines to DOCX.
+
+    The source is consumed lazily with one line of lookahead, so it never
+    has to be held in memory; only the document being built is resident.
+
+    Args:
+        src (iterable): Markdown lines, e.g. an open file object, sys.stdin or a generator
+        dst (str or file): Output path or writable binary file object
+        backend (str): 'docx' builds the document with python-docx; 'fast'
+            serializes the document XML directly (see fast_docx_writer);
+            'chunked' does the same with the body spilled to a temporary
+            file section by section, keeping memory flat for very long documents; 'parallel'
+            renders runs of sections in worker processes, one per CPU, and
+            merges them into the fast backend's output (see parallel_docx)
+        images (ImagePipeline, optional): Image loader; a fresh one is used per
+            document when omitted
+        template (str, optional): .docx or .dotx template file; it is prepared
+            once per process and cloned for each document
+        hook (callable, optional): Called with a record for every stage, block
+            and image, with their timings (see conversion_profile)
+
+    Returns:
+        Document or FastDocxWriter: The generated document
+    """
+    if backend == 'parallel':
+        from parallel_docx import convert_stream_parallel
+        return convert_stream_parallel(src, dst, images=images, template=template, hook=hook)
+    return write_docx(iter_blocks(src), dst, backend=backend, images=images, template=template, hook=hook)
+
+def convert_to_formats(src, outputs, backend='docx', images=None, template=None, hook=None):
+    """
+    Convert Markdown to several output formats from a single parse.
+
+    The source is tokenized once into a list of block records, the document
+    model every renderer works from, and each output is rendered from that
+    list. Images are loaded through one pipeline, so an image used by both
+    the DOCX and the HTML output is read and downsampled once. With a single
+    output the source is streamed as in convert_stream.
+
+    Args:
+        src (iterable): Markdown lines
+        outputs (dict): Output format (one of FORMATS) -> path or writable binary file object
+        backend (str): DOCX backend, one of BACKENDS
+        images (ImagePipeline, optional): Image loader shared by all outputs
+        template (str, optional): .docx or .dotx template file for the DOCX output
+        hook (callable, optional): Instrumentation hook; receives the records of every output
+
+    Returns:
+        dict: Output format -> the rendered document or writer
+    """
+    for output_format in outputs:
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown format {output_format!r}, expected one of {FORMATS}")
+    if len(outputs) == 1:
+        if outputs.get('docx') is not None:
+            return {'docx': convert_stream(src, outputs['docx'], backend=backend, images=images, template=template,
+                                           hook=hook)}
+        blocks = iter_blocks(src)
+    else:
+        if images is None:
+            images = open_image_pipeline()
+        start = time.perf_counter()
+        blocks = list(iter_blocks(src))
+        if hook is not None:
+            hook({"event": "stage", "stage": "parse", "seconds": time.perf_counter() - start})
+
+    return {output_format: render_blocks(blocks, output_format, dst, backend=backend, images=images,
+                                         template=template, hook=hook)
+            for output_format, dst in outputs.items()}
 
-def process_markdown_formatting(text):
+def render_blocks(blocks, output_format, dst, backend='docx', images=None, template=None, hook=None):
     """
-    Process markdown formatting in text before creating a paragraph.
-    Use this for simple formatting in texts that will be directly added as paragraphs.
+    Render block records in one output format.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        output_format (str): One of FORMATS
+        dst (str or file): Output path or writable binary file object
+        backend, images, template, hook: As for convert_stream; backend and
+            template only apply to DOCX
+
+    Returns:
+        The rendered document or writer
+    """
+    if output_format == 'docx':
+        return write_docx(blocks, dst, backend=backend, images=images, template=template, hook=hook)
+    if output_format not in RENDERERS:
+        raise ValueError(f"Unknown format {output_format!r}, expected one of {FORMATS}")
+    return RENDERERS[output_format](blocks, dst, images=images, hook=hook)
+
+def write_docx(blocks, dst, backend='docx', images=None, template=None, hook=None):
+    """
+    Build a DOCX from block records and save it to dst.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        dst (str or file): Output path or writable binary file object
+        backend, images, template, hook: As for convert_stream
+
+    Returns:
+        Document or FastDocxWriter: The generated document
+    """
+    if backend in ('fast', 'chunked'):
+        from fast_docx_writer import write_fast_docx
+        return write_fast_docx(blocks, dst, images=images, template=template, hook=hook, chunked=backend == 'chunked')
+    if backend == 'parallel':
+        from parallel_docx import write_parallel_docx
+        return write_parallel_docx(blocks, dst, images=images, template=template, hook=hook)
+    if backend != 'docx':
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+    start = time.perf_counter()
+    doc = new_document(template)
+    if hook is not None:
+        hook({"event": "stage", "stage": "setup", "seconds": time.perf_counter() - start})
+
+    build_document(blocks, doc, images=images, hook=hook)
+
+    start = time.perf_counter()
+    doc.save(dst)
+    if hook is not None:
+        hook({"event": "stage", "stage": "save", "seconds": time.perf_counter() - start})
+    return doc
+
+def warm_up(template=None):
+    """
+    Load python-docx and lxml and prepare the template, so that later
+    conversions in this process only pay for cloning it. Used as the
+    initializer of worker pools.
+    """
+    # Serializing the parts up front leaves nothing to set up for the fast backend either
+    get_template(template).package_parts()
+
+def new_document(template=None):
+    """Create an empty Word document with the styles the converter relies on."""
+    return get_template(template).new_document()
+
+def build_document(blocks, doc, images=None, hook=None):
+    """
+    Add a stream of Markdown block records to a Word document.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        doc (Document): The python-docx document to append to
+        images (ImagePipeline, optional): Image loader shared by all images in
+            the document, so each distinct image is read and scaled once
+        hook (callable, optional): Instrumentation hook, see conversion_profile
+
+    Returns:
+        Document: The same document, for chaining
     """
-    # This function is used when we can't add runs to an existing paragraph (like list items)
-    # For complex formatting, use add_formatted_text instead
-    
-    # Remove markdown bold formatting as we can't apply it in this simple mode
-    # We'll rely on the actual Word styling for lists
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    return text
+    return build_blocks(blocks, doc, DOCX_EMITTERS, images=images, hook=hook)
+
+class DocxEmitters(BlockEmitters):
+    """Adds blocks to a python-docx Document."""
+
+    def list_item(self, doc, block):
+        paragraph = doc.add_paragraph(style=block.style)
+        add_formatted_text(paragraph, block.text)
+
+    def code(self, doc, block):
+        doc.add_paragraph(block.text, style='CodeBlock')
+
+    def table(self, doc, block):
+        add_table(doc, block.rows, align=block.align)
+
+    def paragraph(self, doc, block):
+        paragraph = doc.add_paragraph()
+        add_formatted_text(paragraph, block.text)
+
+    def image(self, doc, block, data):
+        doc.add_picture(io.BytesIO(data), width=Inches(6.0))  # Adjust width as needed
+
+DOCX_EMITTERS = DocxEmitters()
 
 def add_formatted_text(paragraph, text):
     """
-    Add text to a paragraph with markdown formatting applied.
+    Add text to a paragraph with markdown formatting applied. Bold and
+    italic text become bold and italic runs, inline code becomes a
+    Courier New run and links become blue, underlined runs.
     """
-    # Process bold text
-    parts = re.split(r'(\*\*.*?\*\*)', text)
-    
-    for part in parts:
-        if part.startswith('**') and part.endswith('**'):
-            # Bold text
-            bold_text = part[2:-2]  # Remove the ** markers
-            run = paragraph.add_run(bold_text)
+    for kind, span_text, _ in iter_inline_spans(text):
+        run = paragraph.add_run(span_text)
+        if kind == BOLD:
             run.bold = True
-        else:
-            # Regular text
-            if part:
-                paragraph.add_run(part)
+        elif kind == ITALIC:
+            run.italic = True
+        elif kind == BOLD_ITALIC:
+            run.bold = True
+            run.italic = True
+        elif kind == CODE_SPAN:
+            run.font.name = 'Courier New'
+        elif kind == LINK:
+            run.font.color.rgb = docx.shared.RGBColor(0, 0, 255)
+            run.underline = True
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <input_md_file> <output_docx_file>")
+def main(argv=None, prog=None):
+    """Command-line interface of generate_word_from_md.py (argv defaults to sys.argv[1:])."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=prog, description="Convert a Markdown file to a Word document.")
+    parser.add_argument('input_md_file', help="Markdown file to convert, or - to read from stdin")
+    parser.add_argument('output_docx_file', help="DOCX file to write, or - to write to stdout")
+    parser.add_argument('--backend', choices=BACKENDS, default='docx',
+                        help="docx: build with python-docx (default); fast: serialize the XML directly; "
+                             "chunked: like fast, with memory use independent of document length; "
+                             "parallel: like fast, rendering sections in one worker process per CPU")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Reuse documents from this build cache when nothing they depend on changed")
+    parser.add_argument('--cache-max-mb', type=float, default=None, help="Evict cache entries beyond this total size")
+    parser.add_argument('--cache-max-age-days', type=float, default=None, help="Evict cache entries unused for this long")
+    parser.add_argument('--image-cache-dir', default=None, help="Keep downsampled images here across runs")
+    parser.add_argument('--image-dpi', type=int, default=None,
+                        help="Downsample images wider than 6 inches at this density (default: 200)")
+    parser.add_argument('--template', default=None, help=".docx or .dotx file providing the styles and page setup")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Render only the sections changed since the last incremental build of the output, "
+                             "keeping a section manifest next to it (uses the fast backend)")
+    for output_format in RENDERERS:
+        parser.add_argument('--' + output_format, default=None, metavar='PATH',
+                            help=f"Also write a {output_format.upper()} rendering to PATH, from the same parse")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print per-stage and per-block-type timings to stderr")
+    parser.add_argument('--profile-json', default=None, metavar='PATH',
+                        help="Write the timing report as JSON to this file")
+    parser.add_argument('--cprofile', default=None, metavar='PATH',
+                        help="Run the conversion under cProfile and write the stats to this file")
+    args = parser.parse_args(argv)
+    if args.incremental and '-' in (args.input_md_file, args.output_docx_file):
+        parser.error("--incremental needs file paths for the input and the output")
+    if args.incremental and args.cache_dir:
+        parser.error("--incremental and --cache-dir cannot be combined")
+    images = open_image_pipeline(args.image_cache_dir, args.image_dpi)
+    also = {output_format: getattr(args, output_format) for output_format in RENDERERS if getattr(args, output_format)}
+
+    profiler = None
+    if args.profile or args.profile_json:
+        from conversion_profile import ConversionProfiler
+        profiler = ConversionProfiler()
+    if args.cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    if args.input_md_file == '-' or args.output_docx_file == '-':
+        src = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8') if args.input_md_file == '-' else open(args.input_md_file, 'r', encoding='utf-8')
+        dst = sys.stdout.buffer if args.output_docx_file == '-' else args.output_docx_file
+        with src:
+            convert_to_formats(src, dict(also, docx=dst), backend=args.backend, images=images, template=args.template,
+                               hook=profiler)
+        print(f"Document successfully created: {args.output_docx_file}", file=sys.stderr)
+    elif args.incremental:
+        from incremental_docx import build_incremental
+        build_incremental(args.input_md_file, args.output_docx_file, images=images, template=args.template,
+                          hook=profiler, also=also)
+        for output_format, path in also.items():
+            print(f"{output_format.upper()} rendering created: {path}")
     else:
-        input_md_file = sys.argv[1]
-        output_docx_file = sys.argv[2]
-        generate_word_from_md(input_md_file, output_docx_file)
\ No newline at end of file
+        cache = open_build_cache(args.cache_dir, args.cache_max_mb, args.cache_max_age_days) if args.cache_dir else None
+        generate_word_from_md(args.input_md_file, args.output_docx_file, backend=args.backend, cache=cache,
+                              images=images, template=args.template, hook=profiler, also=also)
+        if cache is not None:
+            cache.evict()
+    images.evict()
+
+    if args.cprofile:
+        cprofiler.disable()
+        cprofiler.dump_stats(args.cprofile)
+        print(f"cProfile stats written to {args.cprofile}", file=sys.stderr)
+    if args.profile:
+        print(profiler.summary(), file=sys.stderr)
+    if args.profile_json:
+        import json
+        with open(args.profile_json, 'w', encoding='utf-8') as profile_file:
+            json.dump(profiler.report(), profile_file, indent=2)
+
+if __name__ == "__main__":
+    main()
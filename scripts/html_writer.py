@@ -0,0 +1,211 @@
+"""
+HTML renderer.
+
+Renders the Markdown block records (see md_blocks) as a standalone HTML
+page, e.g. for a preview shown next to the DOCX download. Inline
+formatting comes from the same tokenizer as the DOCX backends, so the page
+shows the same bold, italic, code and link spans as the document. Images
+are read through the image pipeline and embedded as data URIs, so the page
+needs no other files.
+"""
+import base64
+import html
+import re
+
+from conversion_profile import BlockEmitters, build_blocks
+from md_inline import iter_inline_spans, PLAIN, BOLD, ITALIC, BOLD_ITALIC, CODE_SPAN, LINK
+
+# Opening and closing tags for each inline span kind except links
+SPAN_TAGS = {
+    PLAIN: ('', ''),
+    BOLD: ('<strong>', '</strong>'),
+    ITALIC: ('<em>', '</em>'),
+    BOLD_ITALIC: ('<strong><em>', '</em></strong>'),
+    CODE_SPAN: ('<code>', '</code>'),
+}
+
+# List item styles set by md_blocks -> (list element, nesting level)
+LIST_TAGS = {
+    'List Bullet': ('ul', 1),
+    'List Bullet 2': ('ul', 2),
+    'List Number': ('ol', 1),
+}
+
+# Leading bytes of the image formats python-docx accepts -> MIME type
+IMAGE_SIGNATURES = (
+    (b'\x89PNG', 'image/png'),
+    (b'\xff\xd8', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+    (b'BM', 'image/bmp'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+)
+
+# Link URL schemes rendered as links; links with any other scheme (javascript:,
+# data:, vbscript:, ...) are rendered as their text only. Relative links have no scheme
+SAFE_URL_SCHEMES = ('http', 'https', 'mailto')
+URL_SCHEME_PATTERN = re.compile(r'([a-zA-Z][a-zA-Z0-9+.-]*):')
+# Browsers drop these from a URL before reading its scheme
+URL_IGNORED_PATTERN = re.compile(r'[\x00-\x20\x7f]+')
+
+PAGE_STYLE = (
+    'body { font-family: Calibri, Arial, sans-serif; max-width: 48em; margin: 2em auto; }\n'
+    'pre { font-family: "Courier New", monospace; font-size: 10pt; }\n'
+    'table { border-collapse: collapse; }\n'
+    'th, td { border: 1px solid #000; padding: 0.2em 0.5em; }\n'
+    'img { max-width: 100%; }\n'
+)
+
+
+def is_safe_url(url):
+    """Whether a link URL is relative or uses one of SAFE_URL_SCHEMES."""
+    match = URL_SCHEME_PATTERN.match(URL_IGNORED_PATTERN.sub('', url))
+    return match is None or match.group(1).lower() in SAFE_URL_SCHEMES
+
+
+def inline_html(text):
+    """
+    Render markdown inline text as HTML, one element per inline span. Links
+    whose URL is not safe (see is_safe_url) are rendered as plain text.
+    """
+    parts = []
+    for kind, span_text, url in iter_inline_spans(text):
+        if kind == LINK and not is_safe_url(url):
+            parts.append(html.escape(span_text, quote=False))
+        elif kind == LINK:
+            parts.append(f'<a href="{html.escape(url)}">{html.escape(span_text, quote=False)}</a>')
+        else:
+            open_tag, close_tag = SPAN_TAGS[kind]
+            parts.append(open_tag + html.escape(span_text, quote=False) + close_tag)
+    return ''.join(parts)
+
+
+def image_mime_type(data):
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    return 'application/octet-stream'
+
+
+class HtmlWriter(object):
+    """
+    Collects the body of an HTML page block by block. Consecutive list
+    items are grouped into ul/ol elements, with nested items inside the
+    preceding item.
+    """
+
+    def __init__(self):
+        self.title = None
+        self._body = []
+        self._lists = []  # Tags of the open lists, outermost first
+
+    def write(self, markup):
+        """Append block-level HTML, closing any open lists first."""
+        self.close_lists()
+        self._body.append(markup)
+
+    def close_lists(self, level=0):
+        """Close open lists until `level` of them remain."""
+        while len(self._lists) > level:
+            self._body.append(f'</li></{self._lists.pop()}>\n')
+
+    def add_heading(self, text, level=1):
+        if self.title is None:
+            self.title = text
+        self.write(f'<h{level}>{html.escape(text, quote=False)}</h{level}>\n')
+
+    def add_paragraph(self, text):
+        self.write(f'<p>{inline_html(text)}</p>\n')
+
+    def add_list_item(self, text, style):
+        tag, level = LIST_TAGS.get(style, ('ul', 1))
+        self.close_lists(level)
+        if len(self._lists) == level:
+            if self._lists[-1] == tag:
+                self._body.append('</li>\n')
+            else:
+                self.close_lists(level - 1)
+        while len(self._lists) < level:
+            # A list nested without a parent item still needs an item to live in
+            self._body.append(f'<{tag}>' if len(self._lists) == level - 1 else f'<{tag}><li>')
+            self._lists.append(tag)
+        self._body.append(f'<li>{inline_html(text)}')
+
+    def add_code(self, text, lang=None):
+        css_class = f' class="language-{html.escape(lang)}"' if lang else ''
+        self.write(f'<pre><code{css_class}>{html.escape(text, quote=False)}</code></pre>\n')
+
+    def add_table(self, rows, align=None):
+        align = align or [None] * len(rows[0])
+        styles = [f' style="text-align: {column_align}"' if column_align else '' for column_align in align]
+        parts = ['<table>\n<thead>\n<tr>']
+        parts.extend(f'<th{style}>{inline_html(text)}</th>' for style, text in zip(styles, rows[0]))
+        parts.append('</tr>\n</thead>\n<tbody>\n')
+        for row in rows[1:]:
+            parts.append('<tr>')
+            parts.extend(f'<td{style}>{inline_html(text)}</td>' for style, text in zip(styles, row))
+            parts.append('</tr>\n')
+        parts.append('</tbody>\n</table>\n')
+        self.write(''.join(parts))
+
+    def add_image(self, data, alt=''):
+        encoded = base64.b64encode(data).decode('ascii')
+        self.write(f'<p><img src="data:{image_mime_type(data)};base64,{encoded}" alt="{html.escape(alt)}"></p>\n')
+
+    def to_html(self):
+        """Return the complete page."""
+        self.close_lists()
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{html.escape(self.title or "", quote=False)}</title>\n'
+            f'<style>\n{PAGE_STYLE}</style>\n</head>\n<body>\n'
+            + ''.join(self._body)
+            + '</body>\n</html>\n'
+        )
+
+    def save(self, dst):
+        """
+        Write the page as UTF-8.
+
+        Args:
+            dst (str or file): Output path or writable binary file object
+        """
+        data = self.to_html().encode('utf-8')
+        if isinstance(dst, str):
+            with open(dst, 'wb') as f:
+                f.write(data)
+        else:
+            dst.write(data)
+
+
+# HtmlWriter has the methods the default emitters call
+HTML_EMITTERS = BlockEmitters()
+
+
+def build_html(blocks, writer, images=None, hook=None):
+    """
+    Add a stream of Markdown block records to an HtmlWriter.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        writer (HtmlWriter): The writer to append to
+        images (ImagePipeline, optional): Image loader shared by all images in the page
+        hook (callable, optional): Instrumentation hook, see conversion_profile
+
+    Returns:
+        HtmlWriter: The same writer, for chaining
+    """
+    return build_blocks(blocks, writer, HTML_EMITTERS, images=images, hook=hook)
+
+
+def write_html(blocks, dst, images=None, hook=None):
+    """
+    Render block records as an HTML page and write it to dst (a path or a
+    writable binary file object).
+
+    Returns:
+        HtmlWriter: The writer
+    """
+    writer = build_html(blocks, HtmlWriter(), images=images, hook=hook)
+    writer.save(dst)
+    return writer
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import os
+import time
+
+from build_cache import evict_lru, _write_atomic, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE_SECONDS
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # Pillow is optional; without it images are embedded unscaled
+    PILImage = None
+
+# Images are rendered 6 inches wide; pixels beyond this density are never visible
+TARGET_WIDTH_INCHES = 6.0
+DEFAULT_TARGET_DPI = 200
+
+# Formats that are re-encoded after downsampling; anything else is embedded as is
+RESAMPLE_FORMATS = {'PNG': '.png', 'JPEG': '.jpg'}
+
+# Marker suffix for disk cache entries whose source needed no processing
+UNCHANGED_SUFFIX = '.unchanged'
+
+class ImagePipeline(object):
+    """
+    Loads images for embedding, downsampling anything wider than the
+    6-inch target at target_dpi.
+
+    Within one pipeline each image file is read and processed once, so
+    repeated occurrences yield identical bytes and both backends store a
+    single picture part and share its relationship ID. With a cache_dir,
+    processed images are also kept on disk across runs, keyed by a hash
+    of the source bytes and the target size, and evicted least recently
+    used first.
+
+    Args:
+        cache_dir (str, optional): Directory for the cross-run processed image cache
+        target_dpi (int): Pixel density of the 6-inch rendered width
+        max_bytes (int): Disk cache size limit
+        max_age_seconds (int): Disk cache entries unused for this long are evicted
+        root (str, optional): Only load images located inside this directory;
+            relative image paths are resolved against it
+    """
+
+    def __init__(self, cache_dir=None, target_dpi=DEFAULT_TARGET_DPI,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS, root=None):
+        self.cache_dir = cache_dir
+        self.root = os.path.realpath(root) if root else None
+        self.target_dpi = target_dpi
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._loaded = {}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def max_width_px(self):
+        return int(TARGET_WIDTH_INCHES * self.target_dpi)
+
+    def load(self, image_path):
+        """
+        Return the bytes to embed for image_path.
+
+        Raises:
+            OSError: If the image cannot be read
+            PermissionError: If the image lies outside root
+        """
+        if self.root is not None:
+            image_path = os.path.join(self.root, image_path)
+            real_path = os.path.realpath(image_path)
+            if os.path.commonpath([self.root, real_path]) != self.root:
+                raise PermissionError(f"Image {image_path} is outside {self.root}")
+        stat = os.stat(image_path)
+        memo_key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._loaded:
+            with open(image_path, 'rb') as f:
+                source = f.read()
+            self._loaded[memo_key] = self._process_cached(source)
+        return self._loaded[memo_key]
+
+    def open(self, image_path):
+        """Return a BytesIO over the bytes to embed, for add_picture()."""
+        return io.BytesIO(self.load(image_path))
+
+    def _process_cached(self, source):
+        if not self.cache_dir:
+            return self.process(source)
+
+        key = hashlib.sha256(source + f'\0{self.max_width_px}'.encode('ascii')).hexdigest()
+        for suffix in list(RESAMPLE_FORMATS.values()) + [UNCHANGED_SUFFIX]:
+            path = os.path.join(self.cache_dir, key + suffix)
+            if os.path.exists(path):
+                now = time.time()
+                os.utime(path, (now, now))
+                if suffix == UNCHANGED_SUFFIX:
+                    return source
+                with open(path, 'rb') as f:
+                    return f.read()
+
+        processed, suffix = self._resample(source)
+        if suffix is None:
+            _write_atomic(os.path.join(self.cache_dir, key + UNCHANGED_SUFFIX), b'')
+        else:
+            _write_atomic(os.path.join(self.cache_dir, key + suffix), processed)
+        return processed
+
+    def process(self, source):
+        """
+        Downsample image bytes wider than max_width_px. Returns the source
+        bytes unchanged when no processing is needed or possible.
+        """
+        return self._resample(source)[0]
+
+    def _resample(self, source):
+        """Return (bytes, suffix), where suffix is None if the source was left unchanged."""
+        if PILImage is None:
+            return source, None
+        try:
+            image = PILImage.open(io.BytesIO(source))
+            image_format = image.format
+            if image_format not in RESAMPLE_FORMATS or image.width <= self.max_width_px:
+                return source, None
+            height = max(1, round(image.height * self.max_width_px / image.width))
+            resized = image.resize((self.max_width_px, height), PILImage.LANCZOS)
+        except Exception:
+            # Leave anything Pillow cannot decode for the backends to handle
+            return source, None
+
+        out = io.BytesIO()
+        dpi = (self.target_dpi, self.target_dpi)
+        if image_format == 'JPEG':
+            resized.save(out, 'JPEG', quality=90, optimize=True, dpi=dpi)
+        else:
+            resized.save(out, 'PNG', optimize=True, dpi=dpi)
+        return out.getvalue(), RESAMPLE_FORMATS[image_format]
+
+    def evict(self):
+        """Apply the disk cache size and age limits. Returns the number of entries removed."""
+        if not self.cache_dir:
+            return 0
+        return evict_lru(self.cache_dir, self.max_bytes, self.max_age_seconds)
@@ -0,0 +1,318 @@
+"""
+Incremental DOCX rebuilds.
+
+A document written by build_incremental gets a section manifest next to it
+(<output>.sections.json) recording the fingerprint of every section - a
+heading and the blocks up to the next heading, see md_blocks.iter_sections -
+and the byte range of its XML in word/document.xml. On the next run only
+the sections whose fingerprint is not in the manifest are rendered; the XML
+of the others is copied from the existing document, and the pictures
+already in the package keep their relationship IDs. Editing one paragraph
+of a long manual therefore renders one section instead of the whole
+document.
+
+The document is rebuilt in full when there is no usable manifest: none was
+written yet, it was written by another converter version or with another
+template or image density, or the document was changed since.
+
+Documents are written by the fast backend's writer and read the same
+through test_docx_format as a full build.
+"""
+import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import zipfile
+
+from docx.image.image import Image
+
+from build_cache import hash_file, _write_atomic
+from docx_template import get_template
+from fast_docx_writer import (FastDocxWriter, build_fast_document, DOCUMENT_PART, DOCUMENT_RELS_PART, IMAGE_RELTYPE,
+                              EMBED_PATTERN)
+from generate_word_from_md import CONVERTER_VERSION, render_blocks
+from image_cache import ImagePipeline
+from md_blocks import iter_blocks, iter_sections, IMAGE
+
+MANIFEST_SUFFIX = '.sections.json'
+MANIFEST_VERSION = 1
+
+RELATIONSHIP_PATTERN = re.compile(r'<Relationship\b[^>]*>')
+ATTRIBUTE_PATTERN = re.compile(r'(\w+)="([^"]*)"')
+SHAPE_ID_PATTERN = re.compile(rb'<wp:docPr id="(\d+)"')
+
+
+def manifest_path_for(output_file_path):
+    return output_file_path + MANIFEST_SUFFIX
+
+
+class ImageDigests(object):
+    """
+    SHA-256 digests of image files by the path written in the Markdown
+    source. Digests recorded by the previous build are reused for files
+    whose size and modification time are unchanged.
+
+    Args:
+        root (str, optional): Directory relative image paths are resolved
+            against, as in ImagePipeline
+        known (dict, optional): path -> [mtime_ns, size, digest] from the manifest
+    """
+
+    def __init__(self, root=None, known=None):
+        self.root = root
+        self.known = known or {}
+        self.entries = {}
+
+    def __call__(self, path):
+        """Return the digest of the image at path, or None if it cannot be read."""
+        entry = self.entries.get(path)
+        if entry is None:
+            full_path = os.path.join(self.root, path) if self.root else path
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                return None
+            entry = self.known.get(path)
+            if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+                entry = [stat.st_mtime_ns, stat.st_size, hash_file(full_path)]
+            self.entries[path] = entry
+        return entry[2]
+
+
+def section_fingerprint(blocks, image_digests):
+    """
+    Fingerprint the content of a section: every field of its blocks except
+    the source line numbers, so sections that merely moved still match,
+    plus the digest of each image it shows.
+
+    Args:
+        blocks (list): The section's Block records
+        image_digests (callable): Maps an image path to its digest, see ImageDigests
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for block in blocks:
+        fields = (block.kind, block.text, block.level, block.style, block.lang, block.rows, block.align, block.path,
+                  image_digests(block.path) if block.kind == IMAGE else None)
+        digest.update(repr(fields).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PreviousBuild(object):
+    """
+    The sections and pictures of an existing document, as recorded by its
+    manifest.
+
+    Args:
+        document_xml (bytes): The document's word/document.xml
+        manifest (dict): Its section manifest
+        images (list): (rId, Image) of the pictures in the package, in rId order
+    """
+
+    def __init__(self, document_xml, manifest, images):
+        self.document_xml = document_xml
+        self.fingerprints = [section["fingerprint"] for section in manifest["sections"]]
+        self.image_digests = manifest.get("images", {})
+        self.images = images
+        self.next_shape_id = max([int(n) for n in SHAPE_ID_PATTERN.findall(document_xml)] or [0]) + 1
+        self._spans = collections.defaultdict(collections.deque)
+        for section in manifest["sections"]:
+            self._spans[section["fingerprint"]].append((section["start"], section["end"]))
+
+    def take(self, fingerprint):
+        """
+        Return the XML of a section with this fingerprint, or None if there
+        is none left. Each section is handed out once, so a repeated section
+        never duplicates picture shape IDs.
+        """
+        spans = self._spans.get(fingerprint)
+        if not spans:
+            return None
+        start, end = spans.popleft()
+        return self.document_xml[start:end].decode('utf-8')
+
+
+def load_previous_build(output_file_path, settings):
+    """
+    Read the existing document and its manifest.
+
+    Args:
+        output_file_path (str): The document
+        settings (dict): Converter settings the manifest must have been written with
+
+    Returns:
+        tuple: (PreviousBuild, None), or (None, reason) when a full build is needed
+    """
+    try:
+        with open(manifest_path_for(output_file_path), 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None, "no section manifest"
+    except (OSError, ValueError):
+        return None, "unreadable section manifest"
+    if manifest.get("settings") != settings:
+        return None, "converter settings changed"
+
+    try:
+        with zipfile.ZipFile(output_file_path) as package:
+            document_xml = package.read(DOCUMENT_PART)
+            if hashlib.sha256(document_xml).hexdigest() != manifest.get("document_sha256"):
+                return None, "document changed since it was built"
+            images = []
+            rels_xml = package.read(DOCUMENT_RELS_PART).decode('utf-8')
+            for element in RELATIONSHIP_PATTERN.findall(rels_xml):
+                attributes = dict(ATTRIBUTE_PATTERN.findall(element))
+                if attributes.get('Type') == IMAGE_RELTYPE:
+                    blob = package.read('word/' + attributes['Target'])
+                    images.append((attributes['Id'], Image.from_blob(blob)))
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None, "unreadable document"
+    images.sort(key=lambda entry: int(entry[0][3:]))
+    return PreviousBuild(document_xml, manifest, images), None
+
+
+class IncrementalDocxWriter(FastDocxWriter):
+    """
+    FastDocxWriter that keeps track of where each section's XML lies in
+    word/document.xml, and that can be seeded with the pictures of a
+    previous build so copied sections keep pointing at them.
+
+    Pictures no section refers to any more are left out of the package.
+
+    Args:
+        template (DocumentTemplate, optional): See FastDocxWriter
+        previous (PreviousBuild, optional): Build whose pictures are kept
+    """
+
+    def __init__(self, template=None, previous=None):
+        super().__init__(template)
+        self.sections = []  # (fingerprint, index of the section's first body fragment)
+        self.section_spans = []  # Filled in by write_document_xml
+        self.document_sha256 = None
+        if previous is not None:
+            for rid, image in previous.images:
+                self._images.setdefault(image.sha1, (rid, image))
+                self._next_rid = max(self._next_rid, int(rid[3:]) + 1)
+            self._next_shape_id = previous.next_shape_id
+
+    def begin_section(self, fingerprint):
+        """Start a section; everything written until the next call belongs to it."""
+        self.sections.append((fingerprint, len(self._body)))
+
+    def write_document_xml(self, out):
+        digest = hashlib.sha256()
+        offset = 0
+
+        def emit(xml):
+            nonlocal offset
+            data = xml.encode('utf-8')
+            out.write(data)
+            digest.update(data)
+            offset += len(data)
+
+        emit(self._document_head)
+        bounds = [index for _, index in self.sections] + [len(self._body)]
+        for xml in self._body[:bounds[0]]:
+            emit(xml)
+        self.section_spans = []
+        for (fingerprint, begin), end in zip(self.sections, bounds[1:]):
+            start = offset
+            for xml in self._body[begin:end]:
+                emit(xml)
+            self.section_spans.append({"fingerprint": fingerprint, "start": start, "end": offset})
+        emit(self._document_tail)
+        self.document_sha256 = digest.hexdigest()
+
+    def save(self, dst):
+        referenced = set()
+        for xml in self._body:
+            if 'r:embed=' in xml:
+                referenced.update(EMBED_PATTERN.findall(xml))
+        self._images = {sha1: entry for sha1, entry in self._images.items() if entry[0] in referenced}
+        super().save(dst)
+
+
+def build_incremental(md_file_path, output_file_path, images=None, template=None, hook=None, also=None):
+    """
+    Convert a Markdown file to a Word document, rendering only the sections
+    that changed since the document was last built this way.
+
+    Args:
+        md_file_path (str): Path to the Markdown file
+        output_file_path (str): Path of the DOCX file to write or update
+        images (ImagePipeline, optional): Image loader to use
+        template (str, optional): .docx or .dotx template file
+        hook (callable, optional): Instrumentation hook, see conversion_profile
+        also (dict, optional): Other renderings to write from the same parse,
+            as format (see generate_word_from_md.RENDERERS) -> output path;
+            these are always rendered in full
+
+    Returns:
+        dict: {"sections": total, "rendered": ..., "reused": ..., "written": whether
+            the document was rewritten, "full_build_reason": why nothing could be
+            reused, or None}
+    """
+    start = time.perf_counter()
+    template = get_template(template)
+    images = images or ImagePipeline()
+    settings = {"manifest_version": MANIFEST_VERSION, "converter_version": CONVERTER_VERSION,
+                "template": template.fingerprint, "image_dpi": images.target_dpi}
+    previous, reason = load_previous_build(output_file_path, settings)
+    digests = ImageDigests(images.root, previous.image_digests if previous else None)
+    writer = IncrementalDocxWriter(template, previous)
+    if hook is not None:
+        hook({"event": "stage", "stage": "setup", "seconds": time.perf_counter() - start})
+
+    rendered = 0
+    parsed = [] if also else None  # Blocks kept for the other renderings
+    with open(md_file_path, 'r', encoding='utf-8') as md_file:
+        for blocks in iter_sections(iter_blocks(md_file)):
+            if parsed is not None:
+                parsed.extend(blocks)
+            fingerprint = section_fingerprint(blocks, digests)
+            writer.begin_section(fingerprint)
+            xml = previous.take(fingerprint) if previous else None
+            if xml is None:
+                build_fast_document(blocks, writer, images=images, hook=hook)
+                rendered += 1
+            else:
+                writer.write(xml)
+
+    fingerprints = [fingerprint for fingerprint, _ in writer.sections]
+    stats = {"sections": len(fingerprints), "rendered": rendered, "reused": len(fingerprints) - rendered,
+             "written": False, "full_build_reason": reason}
+    for output_format, path in (also or {}).items():
+        render_blocks(parsed, output_format, path, images=images, hook=hook)
+    if previous is not None and rendered == 0 and fingerprints == previous.fingerprints:
+        print(f"Document up to date: {output_file_path}")
+        return stats
+
+    start = time.perf_counter()
+    # The existing document stays in place until the new one is complete
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file_path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            writer.save(tmp_file)
+        os.replace(tmp_path, output_file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    manifest = {"settings": settings, "document_sha256": writer.document_sha256,
+                "sections": writer.section_spans, "images": digests.entries}
+    _write_atomic(manifest_path_for(output_file_path), json.dumps(manifest).encode('utf-8'))
+    if hook is not None:
+        hook({"event": "stage", "stage": "save", "seconds": time.perf_counter() - start})
+    stats["written"] = True
+
+    if reason is not None:
+        print(f"Document successfully created: {output_file_path} (full build: {reason})")
+    else:
+        print(f"Document updated: {output_file_path} "
+              f"({rendered} of {len(fingerprints)} sections rendered, {stats['reused']} reused)")
+    return stats
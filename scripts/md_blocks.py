@@ -0,0 +1,302 @@
+import re
+
+# Block kinds emitted by iter_blocks
+HEADING = 'heading'
+LIST_ITEM = 'list_item'
+CODE = 'code'
+TABLE = 'table'
+IMAGE = 'image'
+PARAGRAPH = 'paragraph'
+
+BULLET_PATTERN = re.compile(r'\*\s+(.*)$')
+NUMBER_PATTERN = re.compile(r'\d+\.\s+(.*)$')
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]*)\)')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+TABLE_CELL_BOUNDARY = re.compile(r'(?<!\\)\|')
+
+# Lines indented at least this much are nested list items
+NESTED_INDENT = 2
+
+
+class Block(object):
+    """
+    A typed block record produced by the Markdown tokenizer.
+
+    Only the fields relevant to the block kind are set:
+    - heading: text, level
+    - list_item: text, style
+    - code: text, lang
+    - table: rows (first row is the header; every row has one cell per
+      header cell), align (per column: 'left', 'center', 'right' or None)
+    - image: text (alt text), path
+    - paragraph: text
+    """
+    __slots__ = ('kind', 'text', 'level', 'style', 'lang', 'rows', 'align', 'path', 'line_no')
+
+    def __init__(self, kind, text='', level=0, style=None, lang=None, rows=None, align=None, path=None, line_no=0):
+        self.kind = kind
+        self.text = text
+        self.level = level
+        self.style = style
+        self.lang = lang
+        self.rows = rows
+        self.align = align
+        self.path = path
+        self.line_no = line_no
+
+    def __repr__(self):
+        return f"Block({self.kind!r}, {self.text!r}, line_no={self.line_no})"
+
+
+def _indent_of(raw_line):
+    """Return the width of the leading whitespace of a line, counting tabs as 4."""
+    expanded = raw_line.expandtabs(4)
+    return len(expanded) - len(expanded.lstrip(' '))
+
+
+def is_heading_line(line):
+    """A stripped line that is entirely bold (**...**) is treated as a section heading."""
+    return (line.startswith('**') and line.endswith('**')
+            and not line.startswith('* **') and line.strip('*').strip() != '')
+
+
+def is_table_separator(line):
+    return bool(TABLE_SEPARATOR_PATTERN.match(line.strip()))
+
+
+def split_table_row(line):
+    """
+    Split a table row into its cell texts. The outer pipes are optional,
+    empty cells are kept so that columns stay in place, and an escaped
+    pipe (\\|) is part of the cell text.
+    """
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    if '\\' not in line:
+        return [cell.strip() for cell in line.split('|')]
+    return [cell.strip().replace('\\|', '|') for cell in TABLE_CELL_BOUNDARY.split(line)]
+
+
+def table_alignments(separator):
+    """Read the column alignments (':--', ':-:', '--:') from a table separator row."""
+    alignments = []
+    for cell in split_table_row(separator):
+        if cell.startswith(':') and cell.endswith(':'):
+            alignments.append('center')
+        elif cell.endswith(':'):
+            alignments.append('right')
+        elif cell.startswith(':'):
+            alignments.append('left')
+        else:
+            alignments.append(None)
+    return alignments
+
+
+def fit_row(cells, width, fill=''):
+    """Pad a row with `fill` or drop its extra cells so it has `width` cells."""
+    if len(cells) < width:
+        return cells + [fill] * (width - len(cells))
+    return cells[:width]
+
+
+class LineCursor(object):
+    """
+    Forward-only cursor over an iterable of lines with one line of lookahead.
+
+    Only the current lookahead line is held, so the source (a file object,
+    sys.stdin, a generator) never has to be resident in memory.
+    """
+
+    def __init__(self, lines, first_line_no=1):
+        self._lines = iter(lines)
+        self._peeked = None
+        self.line_no = first_line_no - 1
+
+    def peek(self):
+        """Return the next line without consuming it, or None at end of input."""
+        if self._peeked is None:
+            self._peeked = next(self._lines, None)
+        return self._peeked
+
+    def next(self):
+        """Consume and return the next line, or None at end of input."""
+        line = self.peek()
+        self._peeked = None
+        if line is not None:
+            self.line_no += 1
+        return line
+
+
+def iter_blocks(lines, title=True, first_line_no=1):
+    """
+    Tokenize Markdown lines into typed Block records in a single linear pass.
+
+    Lines are pulled lazily from any iterable (a list, a file object,
+    sys.stdin) with a single line of lookahead, which is all the table
+    separator check needs. Fenced code blocks and tables consume their own
+    lines, so no line is visited twice and identical lines elsewhere in the
+    file never affect the result.
+
+    Args:
+        lines (iterable): Lines of the Markdown source (with or without line endings)
+        title (bool): Whether the first heading is the document title (level
+            1); False when the lines are a part of a document that comes after
+            its title (see iter_section_sources)
+        first_line_no (int): Line number of the first line
+
+    Yields:
+        Block: Block records in document order
+    """
+    cursor = LineCursor(lines, first_line_no)
+    is_first_heading = title
+
+    while True:
+        raw = cursor.next()
+        if raw is None:
+            break
+        line = raw.strip()
+        line_no = cursor.line_no
+
+        # Skip empty lines
+        if not line:
+            continue
+
+        # Fenced code block: consume everything up to the closing fence
+        if line.startswith('```'):
+            language = line[3:].strip() or None
+            code_lines = []
+            code_line = cursor.next()
+            while code_line is not None and code_line.strip() != '```':
+                code_lines.append(code_line.rstrip())
+                code_line = cursor.next()
+            yield Block(CODE, '\n'.join(code_lines), lang=language, line_no=line_no)
+            continue
+
+        # Section heading (a fully bold line); the first one is the title
+        if is_heading_line(line):
+            yield Block(HEADING, line.strip('*'), level=1 if is_first_heading else 2, line_no=line_no)
+            is_first_heading = False
+            continue
+
+        # Bulleted and numbered lists
+        bullet = BULLET_PATTERN.match(line)
+        if bullet:
+            style = 'List Bullet 2' if _indent_of(raw) >= NESTED_INDENT else 'List Bullet'
+            yield Block(LIST_ITEM, bullet.group(1).strip(), style=style, line_no=line_no)
+            continue
+
+        number = NUMBER_PATTERN.match(line)
+        if number:
+            yield Block(LIST_ITEM, number.group(1).strip(), style='List Number', line_no=line_no)
+            continue
+
+        # Images
+        if line.startswith('!['):
+            image = IMAGE_PATTERN.match(line)
+            if image:
+                yield Block(IMAGE, image.group(1), path=image.group(2), line_no=line_no)
+                continue
+
+        # Tables: a row followed by a separator row. The header sets the
+        # column count; data rows are padded or cut to match it
+        if '|' in line and cursor.peek() is not None and is_table_separator(cursor.peek()):
+            header = split_table_row(line)
+            width = len(header)
+            align = fit_row(table_alignments(cursor.next()), width, None)
+            rows = [header]
+            while cursor.peek() is not None and '|' in cursor.peek():
+                rows.append(fit_row(split_table_row(cursor.next()), width))
+            yield Block(TABLE, rows=rows, align=align, line_no=line_no)
+            continue
+
+        # Everything else is a paragraph (inline formatting is handled by md_inline)
+        yield Block(PARAGRAPH, line, line_no=line_no)
+
+
+def iter_sections(blocks):
+    """
+    Group block records into sections, each starting at a heading. Blocks
+    before the first heading form a leading section of their own; no
+    section is empty.
+
+    Args:
+        blocks (iterable): Block records produced by iter_blocks
+
+    Yields:
+        list: The blocks of one section, in document order
+    """
+    section = []
+    for block in blocks:
+        if block.kind == HEADING and section:
+            yield section
+            section = []
+        section.append(block)
+    if section:
+        yield section
+
+
+def iter_section_sources(lines, min_lines=1):
+    """
+    Split Markdown lines into runs of whole sections without tokenizing
+    them, so the runs can be tokenized separately (see parallel_docx).
+
+    Lines are consumed the way iter_blocks consumes them: a run only ends
+    before a line iter_blocks reads as a heading, never inside a fenced code
+    block or a table, so tokenizing each run with iter_blocks(lines, title,
+    first_line_no) gives the same blocks as tokenizing the whole source.
+
+    Args:
+        lines (iterable): Lines of the Markdown source
+        min_lines (int): Sections are grouped until a run has at least this
+            many lines (the last run may be shorter)
+
+    Yields:
+        tuple: (first line number, list of lines, title) where title tells
+            whether the run's first heading is the document title
+    """
+    cursor = LineCursor(lines)
+    run = []
+    run_start = 1
+    run_title = True
+    seen_heading = False
+
+    while True:
+        raw = cursor.next()
+        if raw is None:
+            break
+        line = raw.strip()
+
+        if line.startswith('```'):
+            run.append(raw)
+            code_line = cursor.next()
+            while code_line is not None:
+                run.append(code_line)
+                if code_line.strip() == '```':
+                    break
+                code_line = cursor.next()
+            continue
+
+        if is_heading_line(line):
+            if run and len(run) >= min_lines:
+                yield run_start, run, run_title
+                run = []
+                run_start = cursor.line_no
+                run_title = not seen_heading
+            seen_heading = True
+            run.append(raw)
+            continue
+
+        run.append(raw)
+        # A table row followed by a separator starts a table, which takes every following line with a pipe
+        if ('|' in line and not BULLET_PATTERN.match(line) and not NUMBER_PATTERN.match(line)
+                and not (line.startswith('![') and IMAGE_PATTERN.match(line))
+                and cursor.peek() is not None and is_table_separator(cursor.peek())):
+            run.append(cursor.next())
+            while cursor.peek() is not None and '|' in cursor.peek():
+                run.append(cursor.next())
+
+    if run:
+        yield run_start, run, run_title
@@ -0,0 +1,64 @@
+import re
+
+# Inline span kinds emitted by iter_inline_spans
+PLAIN = 'plain'
+BOLD = 'bold'
+ITALIC = 'italic'
+BOLD_ITALIC = 'bold_italic'
+CODE_SPAN = 'code_span'
+LINK = 'link'
+
+# One alternation tried left to right at each position, so a line is
+# tokenized in a single scan. Earlier alternatives win: code spans and
+# links keep their contents literal, and *** is tried before ** and *.
+# Every alternative starts with a literal marker character (the italic
+# lookbehinds come after it) so the engine can skip plain text quickly.
+INLINE_PATTERN = re.compile(r'''
+      `(?P<code_span>[^`]+)`
+    | \[(?P<link>[^\]]*)\]\((?P<url>[^)]*)\)
+    | \*\*\*(?P<bold_italic>.+?)\*\*\*
+    | \*\*(?P<bold>.+?)\*\*
+    | \*(?<![\w*]\*)(?P<italic>[^*\s](?:[^*]*?[^*\s])?)\*(?![\w*])
+    | _(?<!\w_)(?P<italic_u>[^_\s](?:[^_]*?[^_\s])?)_(?!\w)
+''', re.VERBOSE)
+
+# Characters that can start inline markup; text without any is a single plain span
+MARKUP_CHARS = ('*', '_', '`', '[')
+
+
+def iter_inline_spans(text):
+    """
+    Tokenize a line of Markdown into typed inline spans in one pass.
+
+    Args:
+        text (str): Inline Markdown, e.g. a paragraph, list item or table cell
+
+    Yields:
+        tuple: (kind, text, url) with kind one of PLAIN, BOLD, ITALIC,
+            BOLD_ITALIC, CODE_SPAN or LINK; markers are removed from text
+            and url is only set for links
+    """
+    for char in MARKUP_CHARS:
+        if char in text:
+            break
+    else:
+        if text:
+            yield PLAIN, text, None
+        return
+
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        start = match.start()
+        if start > position:
+            yield PLAIN, text[position:start], None
+        kind = match.lastgroup
+        if kind == 'url':
+            yield LINK, match.group('link'), match.group('url')
+        elif kind == 'italic_u':
+            yield ITALIC, match.group(kind), None
+        else:
+            yield kind, match.group(kind), None
+        position = match.end()
+
+    if position < len(text):
+        yield PLAIN, text[position:], None
@@ -0,0 +1,72 @@
+"""
+PaperForge command-line entry point.
+
+Usage:
+    python scripts/paperforge.py [--startup-time] <command> [arguments]
+
+Commands:
+    generate   Convert a Markdown file to a Word document (generate_word_from_md.py)
+    inspect    Print the formatting of a Word document (test_docx_format.py)
+    validate   Convert a Markdown file and validate the result (validate_md_to_docx.py)
+    analyze    Print the formatting rules expected from Markdown files
+    diff       Compare Word documents, or trees of them, by structure (docx_diff.py)
+
+A command's module is imported only when that command runs, so `analyze`,
+which reads nothing but Markdown, starts without loading python-docx or
+lxml. With --startup-time, the time from the start of this script to the
+start of the command (of which importing the command's module) and the
+time the command took are printed to stderr.
+"""
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+
+# Command -> (module, function called as function(argv, prog), help)
+COMMANDS = {
+    'generate': ('generate_word_from_md', 'main', "Convert a Markdown file to a Word document"),
+    'inspect': ('test_docx_format', 'main', "Print the formatting of a Word document"),
+    'validate': ('validate_md_to_docx', 'main', "Convert a Markdown file and validate the result"),
+    'analyze': ('validate_md_to_docx', 'analyze_main', "Print the formatting rules expected from Markdown files"),
+    'diff': ('docx_diff', 'main', "Compare Word documents, or trees of them, by structure"),
+}
+
+def main(argv=None):
+    """
+    Run a command.
+
+    Args:
+        argv (list, optional): Arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int: Exit status
+    """
+    parser = argparse.ArgumentParser(
+        prog='paperforge', description="PaperForge: Markdown to Word conversion and checks.",
+        epilog="Run 'paperforge <command> --help' for the options of a command.")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="Print the time taken to start the command, and to run it, to stderr")
+    parser.add_argument('command', choices=COMMANDS, help=', '.join(COMMANDS))
+    parser.add_argument('arguments', nargs=argparse.REMAINDER, help="Arguments of the command")
+    args = parser.parse_args(argv)
+
+    module_name, function_name, _ = COMMANDS[args.command]
+    import_start = time.perf_counter()
+    command = getattr(importlib.import_module(module_name), function_name)
+    command_start = time.perf_counter()
+    if args.startup_time:
+        print(f"paperforge: startup {command_start - STARTED:.4f}s "
+              f"(importing {module_name}: {command_start - import_start:.4f}s)", file=sys.stderr)
+
+    try:
+        status = command(args.arguments, prog=f'paperforge {args.command}')
+    finally:
+        if args.startup_time:
+            print(f"paperforge: {args.command} ran in {time.perf_counter() - command_start:.4f}s", file=sys.stderr)
+    return status or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
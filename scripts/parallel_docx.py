@@ -0,0 +1,174 @@
+"""
+Parallel DOCX backend.
+
+Renders one long document on several cores. The source is cut at section
+boundaries (a heading and everything up to the next heading) into runs of
+consecutive sections, and each run is tokenized and serialized to body XML
+by a FastDocxWriter in a worker process. The main process only finds the
+section boundaries (md_blocks.iter_section_sources), then merges the
+fragments in document order as they complete, renumbering each fragment's
+picture relationship IDs and shape IDs (see
+FastDocxWriter.add_body_fragment), and packages the result. Already
+tokenized blocks (write_parallel_docx) are split at headings and sent to
+the workers as they are.
+
+Links are plain formatted runs and lists take their numbering from the
+template's list styles, so pictures are the only parts of a fragment that
+refer outside it. The output is identical to the fast backend's.
+"""
+import collections
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from docx_template import get_template
+from fast_docx_writer import FastDocxWriter, ChunkedDocxWriter, build_fast_document
+from image_cache import ImagePipeline
+from md_blocks import iter_blocks, iter_sections, iter_section_sources
+
+# Sections are handed to workers in runs of at least this many source lines
+# (or blocks), so per-task overhead stays small next to the rendering
+MIN_LINES_PER_TASK = 2000
+MIN_BLOCKS_PER_TASK = 500
+# Tasks in flight per worker; bounds the fragments held while waiting for an earlier one
+TASKS_PER_WORKER = 2
+
+# Image pipelines of this worker process, by their options
+_pipelines = {}
+
+
+def iter_section_runs(blocks, min_blocks=MIN_BLOCKS_PER_TASK):
+    """
+    Group consecutive sections into runs of at least min_blocks blocks (the
+    last run may be shorter).
+
+    Yields:
+        list: The blocks of a run, in document order
+    """
+    run = []
+    for section in iter_sections(blocks):
+        run.extend(section)
+        if len(run) >= min_blocks:
+            yield run
+            run = []
+    if run:
+        yield run
+
+
+def image_options(images):
+    """
+    What a worker rebuilds the image pipeline from: its class, so a
+    restricted pipeline (e.g. one that refuses every image) stays
+    restricted, and its options.
+
+    Returns:
+        tuple: (ImagePipeline subclass, dict of options)
+    """
+    return type(images), {"cache_dir": images.cache_dir, "target_dpi": images.target_dpi, "root": images.root}
+
+
+def render_fragment(blocks, template=None, options=None):
+    """
+    Serialize block records to body XML. Runs in a worker process.
+
+    Args:
+        blocks (iterable): Block records of whole sections
+        template (str, optional): .docx or .dotx template file
+        options (tuple, optional): Image pipeline class and options, see image_options
+
+    Returns:
+        tuple: (body XML, list of (rId, image bytes)), see FastDocxWriter.body_fragment
+    """
+    pipeline_class, kwargs = options or (ImagePipeline, {})
+    key = (pipeline_class, tuple(sorted(kwargs.items())))
+    if key not in _pipelines:
+        _pipelines[key] = pipeline_class(**kwargs)
+    writer = build_fast_document(blocks, FastDocxWriter(get_template(template)), images=_pipelines[key])
+    return writer.body_fragment()
+
+
+def render_source_fragment(source, template=None, options=None):
+    """
+    Tokenize and serialize a run of Markdown sections. Runs in a worker process.
+
+    Args:
+        source (tuple): (first line number, lines, title), see md_blocks.iter_section_sources
+        template, options: As for render_fragment
+    """
+    first_line_no, lines, title = source
+    return render_fragment(iter_blocks(lines, title, first_line_no), template, options)
+
+
+def merge_fragments(render, tasks, writer, images=None, template=None, hook=None, jobs=None):
+    """
+    Render tasks across a process pool and merge the fragments into writer in order.
+
+    Args:
+        render (callable): Worker function, render_fragment or render_source_fragment
+        tasks (iterable): First argument of render for each run of sections
+        writer (FastDocxWriter): The writer to merge into
+        images, template, hook, jobs: As for write_parallel_docx
+    """
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    options = image_options(images or ImagePipeline())
+    with ProcessPoolExecutor(max_workers=jobs, initializer=get_template, initargs=(template,)) as executor:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(render, task, template, options))
+            if len(pending) >= jobs * TASKS_PER_WORKER:
+                writer.add_body_fragment(*pending.popleft().result())
+        while pending:
+            writer.add_body_fragment(*pending.popleft().result())
+    if hook is not None:
+        hook({"event": "stage", "stage": "build", "seconds": time.perf_counter() - start})
+
+
+def write_parallel_docx(blocks, dst, images=None, template=None, hook=None, jobs=None, chunked=False):
+    """
+    Parallel equivalent of generate_word_from_md.write_docx.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        dst (str or file): Output path or writable binary file object
+        images (ImagePipeline, optional): Image pipeline the workers copy
+            (each worker loads images through its own pipeline of the same
+            class and options, so the class must be importable by the workers)
+        template (str, optional): .docx or .dotx template file
+        hook (callable, optional): Instrumentation hook; receives the setup,
+            build (tokenizing, rendering and merging the fragments) and save stages
+        jobs (int, optional): Number of worker processes (defaults to the CPU count)
+        chunked (bool): Merge into a ChunkedDocxWriter, keeping memory flat
+
+    Returns:
+        FastDocxWriter: The writer the fragments were merged into
+    """
+    return _write_parallel(render_fragment, iter_section_runs(blocks), dst, images, template, hook, jobs, chunked)
+
+
+def convert_stream_parallel(src, dst, images=None, template=None, hook=None, jobs=None, chunked=False):
+    """
+    Parallel equivalent of generate_word_from_md.convert_stream; the workers
+    also tokenize their part of the source.
+    """
+    return _write_parallel(render_source_fragment, iter_section_sources(src, MIN_LINES_PER_TASK), dst, images,
+                           template, hook, jobs, chunked)
+
+
+def _write_parallel(render, tasks, dst, images, template, hook, jobs, chunked):
+    start = time.perf_counter()
+    writer = ChunkedDocxWriter(get_template(template)) if chunked else FastDocxWriter(get_template(template))
+    if hook is not None:
+        hook({"event": "stage", "stage": "setup", "seconds": time.perf_counter() - start})
+
+    try:
+        merge_fragments(render, tasks, writer, images=images, template=template, hook=hook, jobs=jobs)
+
+        start = time.perf_counter()
+        writer.save(dst)
+        if hook is not None:
+            hook({"event": "stage", "stage": "save", "seconds": time.perf_counter() - start})
+    finally:
+        if chunked:
+            writer.close()
+    return writer
@@ -0,0 +1,127 @@
+"""
+Table engine.
+
+Builds a whole table as a single w:tbl element string instead of adding
+rows and cells one at a time through python-docx, which creates proxy
+objects and walks the table's XML for every row and cell and slows down
+sharply as tables grow.
+
+Column widths are worked out once per table from the longest cell of each
+column, cell paragraphs carry the column alignment from the Markdown
+separator row, and the header row is marked as a repeating header row, so
+a table that runs over several pages repeats its header at the top of
+each page.
+
+The fast writer appends the string to its body; add_table parses it into
+a python-docx document in one step.
+"""
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Length
+from docx.table import Table
+
+from docx_xml import inline_runs_xml, paragraph_properties_xml
+from md_blocks import fit_row
+
+TWIPS_PER_INCH = 1440
+DEFAULT_TEXT_WIDTH = 6 * TWIPS_PER_INCH
+
+# Column widths follow the longest cell of each column, counted within these bounds,
+# so a column of very long cells cannot squeeze the others to nothing
+MIN_COLUMN_CHARS = 3
+MAX_COLUMN_CHARS = 40
+
+TABLE_LOOK = ('<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+              'w:noHBand="0" w:noVBand="1" w:val="04A0"/>')
+
+def column_widths(rows, text_width=DEFAULT_TEXT_WIDTH):
+    """
+    Share the text width between the columns in proportion to the length
+    of their longest cell.
+
+    Args:
+        rows (list): Rows of cell texts, all with the header's cell count
+        text_width (int): Width available to the table, in twips
+
+    Returns:
+        list: Column widths in twips, adding up to text_width
+    """
+    if not rows or not rows[0]:
+        return []
+    weights = [min(max(MIN_COLUMN_CHARS, max(map(len, column))), MAX_COLUMN_CHARS)
+               for column in zip(*rows)]
+    total = sum(weights)
+    widths = [text_width * weight // total for weight in weights]
+    widths[-1] += text_width - sum(widths)
+    return widths
+
+def table_xml(rows, style_id, text_width=DEFAULT_TEXT_WIDTH, align=None, namespaces=False):
+    """
+    Serialize a table. Every row gets one cell per header cell: extra
+    cells are dropped and missing cells are left empty.
+
+    Args:
+        rows (list): Rows of Markdown cell texts; the first row is the header
+        style_id (str): Table style id, e.g. 'TableGrid'
+        text_width (int): Width available to the table, in twips
+        align (list, optional): Per-column alignment: 'left', 'center', 'right' or None
+        namespaces (bool): Declare the w namespace on the w:tbl element, for
+            parsing the table on its own
+
+    Returns:
+        str: The w:tbl element
+    """
+    cols = len(rows[0])
+    rows = [row if len(row) == cols else fit_row(row, cols) for row in rows]
+    widths = column_widths(rows, text_width)
+    align = align or [None] * cols
+
+    grid = ''.join(f'<w:gridCol w:w="{width}"/>' for width in widths)
+    cell_opens = [f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+                  f'<w:p>{paragraph_properties_xml(align=column_align)}'
+                  for width, column_align in zip(widths, align)]
+    declarations = ' ' + nsdecls('w') if namespaces else ''
+
+    parts = [f'<w:tbl{declarations}><w:tblPr><w:tblStyle w:val="{style_id}"/>'
+             f'<w:tblW w:type="auto" w:w="0"/>{TABLE_LOOK}</w:tblPr><w:tblGrid>{grid}</w:tblGrid>']
+    runs = {}  # Serialized runs by cell text; table columns tend to repeat values
+    for index, row in enumerate(rows):
+        parts.append('<w:tr><w:trPr><w:tblHeader/></w:trPr>' if index == 0 else '<w:tr>')
+        for cell_open, text in zip(cell_opens, row):
+            cell_runs = runs.get(text)
+            if cell_runs is None:
+                cell_runs = runs[text] = inline_runs_xml(text)
+            parts.append(cell_open)
+            parts.append(cell_runs)
+            parts.append('</w:p></w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+def document_text_width(doc):
+    """Page width minus left and right margins of a python-docx document's last section, in twips."""
+    section = doc.sections[-1]
+    if None in (section.page_width, section.left_margin, section.right_margin):
+        return DEFAULT_TEXT_WIDTH
+    return Length(section.page_width - section.left_margin - section.right_margin).twips
+
+def add_table(doc, rows, align=None, style='Table Grid'):
+    """
+    Append a table to the end of a python-docx document.
+
+    Args:
+        doc (Document): The document
+        rows (list): Rows of Markdown cell texts; the first row is the header
+        align (list, optional): Per-column alignment, see table_xml
+        style (str): Table style name
+
+    Returns:
+        Table: The added table
+    """
+    tbl = parse_xml(table_xml(rows, doc.styles[style].style_id, document_text_width(doc), align, namespaces=True))
+    body = doc.element.body
+    if body.sectPr is not None:
+        body.sectPr.addprevious(tbl)
+    else:
+        body.append(tbl)
+    return Table(tbl, doc)
@@ -1,53 +1,63 @@
-from docx import Document
-from docx.enum.style import WD_STYLE_TYPE
+from docx_inspect import iter_docx_body, LIST_TYPES
+
+class DocxFormatPrinter(object):
+    """
+    Prints the format of body records from docx_inspect as they stream by.
+    Paragraphs are printed immediately; tables are printed by finish(),
+    after all paragraphs.
+    """
+
+    def __init__(self):
+        self._tables = []
+
+    def __call__(self, record):
+        if record["kind"] == "table":
+            self._tables.append(record)
+            return
+
+        style = record["style"]
+        text = record["text"].strip()
 
-def test_docx_format(docx_file_path):
-    # Open the Word document
-    doc = Document(docx_file_path)
-
-    # Iterate through paragraphs and print their format
-    for i, paragraph in enumerate(doc.paragraphs):
-        style = paragraph.style.name
-        text = paragraph.text.strip()
-        
-        # Check for bold, italic, underline
-        is_bold = paragraph.runs and any(run.bold for run in paragraph.runs)
-        is_italic = paragraph.runs and any(run.italic for run in paragraph.runs)
-        is_underlined = paragraph.runs and any(run.underline for run in paragraph.runs)
-        
-        # Check for color
-        color = None
-        if paragraph.runs and hasattr(paragraph.runs[0].font.color, 'rgb'):
-            color = paragraph.runs[0].font.color.rgb
-        
         # Check for list type
-        is_list = style in ['List Bullet', 'List Number', 'List Bullet 2']
-        list_type = None
-        if is_list:
-            if style == 'List Bullet':
-                list_type = 'Bulleted'
-            elif style == 'List Number':
-                list_type = 'Numbered'
-            elif style == 'List Bullet 2':
-                list_type = 'Nested Bulleted'
-        
+        list_type = LIST_TYPES.get(style)
+
         if text:
-            format_info = f"Style: {style}, Bold: {is_bold}, Italic: {is_italic}, Underlined: {is_underlined}, Color: {color}"
-            if is_list:
+            format_info = (f"Style: {style}, Bold: {record['bold']}, Italic: {record['italic']}, "
+                           f"Underlined: {record['underline']}, Color: {record['color']}")
+            if list_type:
                 format_info += f", List Type: {list_type}"
-            print(f"Paragraph {i + 1}: '{text}' ({format_info})")
-    
-    # Iterate through tables and print their contents
-    for i, table in enumerate(doc.tables):
-        print(f"\nTable {i + 1}:")
-        for row in table.rows:
-            row_text = [cell.text for cell in row.cells]
-            print(f"  Row: {row_text}")
+            print(f"Paragraph {record['index'] + 1}: '{text}' ({format_info})")
 
-if __name__ == "__main__":
+    def finish(self):
+        # Print the tables and their contents
+        for table in self._tables:
+            print(f"\nTable {table['index'] + 1}:")
+            for row in table["rows"]:
+                print(f"  Row: {row}")
+        self._tables = []
+
+def test_docx_format(docx_file_path):
+    """
+    Print the style and formatting of every paragraph and the contents of
+    every table in a Word document.
+
+    Args:
+        docx_file_path (str or file): Path or binary file object of a .docx file
+    """
+    printer = DocxFormatPrinter()
+    for record in iter_docx_body(docx_file_path):
+        printer(record)
+    printer.finish()
+
+def main(argv=None, prog=None):
+    """Command-line interface of test_docx_format.py (argv defaults to sys.argv[1:])."""
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: python test_docx_format.py <docx_file_path>")
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print(f"Usage: {prog or 'python test_docx_format.py'} <docx_file_path>")
     else:
-        docx_file_path = sys.argv[1]
-        test_docx_format(docx_file_path)
\ No newline at end of file
+        docx_file_path = argv[0]
+        test_docx_format(docx_file_path)
+
+if __name__ == "__main__":
+    main()
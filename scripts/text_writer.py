@@ -0,0 +1,141 @@
+"""
+Plain text renderer.
+
+Renders the Markdown block records (see md_blocks) as readable plain
+text: underlined headings, indented lists and code, tables laid out in
+padded columns, and inline markup dropped (links keep their target in
+parentheses). Useful for search indexing, diffs and quick previews.
+"""
+from conversion_profile import BlockEmitters, build_blocks
+from md_inline import iter_inline_spans, LINK
+
+HEADING_UNDERLINES = {1: '=', 2: '-'}
+CODE_INDENT = '    '
+
+
+def plain_text(text):
+    """Drop markdown inline markup, keeping link targets in parentheses."""
+    parts = []
+    for kind, span_text, url in iter_inline_spans(text):
+        parts.append(f'{span_text} ({url})' if kind == LINK and url and url != span_text else span_text)
+    return ''.join(parts)
+
+
+def _aligned(text, width, align):
+    if align == 'right':
+        return text.rjust(width)
+    if align == 'center':
+        return text.center(width)
+    return text.ljust(width)
+
+
+class TextWriter(object):
+    """Collects plain text block by block, with a blank line between blocks."""
+
+    def __init__(self):
+        self._parts = []
+        self._list_numbers = None  # Next number of each open numbered list level, while in a list
+
+    def write(self, text):
+        """Append a block of text, ending any list in progress."""
+        self._end_list()
+        self._parts.append(text.rstrip('\n') + '\n\n')
+
+    def _end_list(self):
+        if self._list_numbers is not None:
+            self._parts.append('\n')
+            self._list_numbers = None
+
+    def add_heading(self, text, level=1):
+        self.write(text + '\n' + HEADING_UNDERLINES.get(level, '-') * len(text))
+
+    def add_paragraph(self, text):
+        self.write(plain_text(text))
+
+    def add_list_item(self, text, style):
+        if self._list_numbers is None:
+            self._list_numbers = {}
+        if style == 'List Number':
+            number = self._list_numbers.get(style, 1)
+            self._list_numbers[style] = number + 1
+            marker = f'{number}.'
+        else:
+            marker = '*'
+        indent = '    ' if style == 'List Bullet 2' else ''
+        self._parts.append(f'{indent}{marker} {plain_text(text)}\n')
+
+    def add_code(self, text, lang=None):
+        self.write('\n'.join(CODE_INDENT + line if line else '' for line in text.split('\n')))
+
+    def add_table(self, rows, align=None):
+        rows = [[plain_text(cell) for cell in row] for row in rows]
+        align = align or [None] * len(rows[0])
+        widths = [max(len(cell) for cell in column) for column in zip(*rows)]
+        lines = [' | '.join(_aligned(cell, width, column_align)
+                            for cell, width, column_align in zip(row, widths, align)).rstrip()
+                 for row in rows]
+        lines.insert(1, '-+-'.join('-' * width for width in widths))
+        self.write('\n'.join(lines))
+
+    def add_image(self, alt, path):
+        self.write(f'[Image: {alt or path}]')
+
+    def to_text(self):
+        """Return the complete text."""
+        self._end_list()
+        return ''.join(self._parts).rstrip('\n') + '\n'
+
+    def save(self, dst):
+        """
+        Write the text as UTF-8.
+
+        Args:
+            dst (str or file): Output path or writable binary file object
+        """
+        data = self.to_text().encode('utf-8')
+        if isinstance(dst, str):
+            with open(dst, 'wb') as f:
+                f.write(data)
+        else:
+            dst.write(data)
+
+
+class TextEmitters(BlockEmitters):
+    """Images are not read; they are rendered as their alt text."""
+
+    loads_images = False
+
+    def image(self, writer, block, data):
+        writer.add_image(block.text, block.path)
+
+
+TEXT_EMITTERS = TextEmitters()
+
+
+def build_text(blocks, writer, hook=None):
+    """
+    Add a stream of Markdown block records to a TextWriter.
+
+    Args:
+        blocks (iterable): Block records produced by md_blocks.iter_blocks
+        writer (TextWriter): The writer to append to
+        hook (callable, optional): Instrumentation hook, see conversion_profile
+
+    Returns:
+        TextWriter: The same writer, for chaining
+    """
+    return build_blocks(blocks, writer, TEXT_EMITTERS, hook=hook)
+
+
+def write_text(blocks, dst, images=None, hook=None):
+    """
+    Render block records as plain text and write it to dst (a path or a
+    writable binary file object). Images are not read; they are rendered
+    as their alt text.
+
+    Returns:
+        TextWriter: The writer
+    """
+    writer = build_text(blocks, TextWriter(), hook=hook)
+    writer.save(dst)
+    return writer
@@ -1,14 +1,25 @@
 import sys
 import os
 import re
-from docx import Document
-from generate_word_from_md import generate_word_from_md
-from test_docx_format import test_docx_format
+import hashlib
+import json
+import shutil
+import collections
 
-def validate_md_to_docx(md_file_path, expected_format_rules=None):
+def default_output_path(md_file_path):
+    """The <name>_validated.docx path next to the source, used by --write-docx without a path."""
+    base_name = os.path.splitext(os.path.basename(md_file_path))[0]
+    return os.path.join(os.path.dirname(md_file_path), f"{base_name}_validated.docx")
+
+def rules_cache_key(expected_format_rules):
+    """Stable digest of a rule set, so cached validation results are tied to the rules they checked."""
+    encoded = json.dumps(expected_format_rules, sort_keys=True, default=list).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def validate_md_to_docx(md_file_path, expected_format_rules=None, cache=None, output_docx_path=None):
     """
     Validates the conversion from Markdown to DOCX by:
-    1. Converting the Markdown file to DOCX
+    1. Converting the Markdown file to an in-memory DOCX
     2. Testing the DOCX formatting
     3. Validating against expected formatting rules (if provided)
     
@@ -21,81 +32,66 @@ def validate_md_to_docx(md_file_path, expected_format_rules=None):
                 'styles': ['Normal', 'CodeBlock'],
                 'bold_text': ['important phrase']
             }
+        cache (BuildCache, optional): Build cache. When the source, its images and
+            the converter are unchanged, the cached document and the validation
+            results stored with it are reused instead of being recomputed.
+        output_docx_path (str, optional): Also write the generated document here.
+            By default nothing is written to disk.
     
     Returns:
         tuple: (bool, dict) - (validation_passed, validation_results)
     """
-    # Create output docx file path
-    base_name = os.path.splitext(os.path.basename(md_file_path))[0]
-    output_docx_path = os.path.join(os.path.dirname(md_file_path), f"{base_name}_validated.docx")
-    
-    print(f"Step 1: Converting {md_file_path} to {output_docx_path}")
-    
-    # Generate the Word document from Markdown
-    try:
-        generate_word_from_md(md_file_path, output_docx_path)
-        print(f"✓ Successfully generated Word document: {output_docx_path}")
-    except Exception as e:
-        print(f"✗ Failed to generate Word document: {str(e)}")
-        return False, {"error": str(e)}
-    
-    print(f"\nStep 2: Testing DOCX formatting of {output_docx_path}")
-    
-    # Collect formatting information
-    doc = Document(output_docx_path)
-    
-    # Create a dictionary to store formatting information
-    format_info = {
-        "headings": [],
-        "lists": [],
-        "styles": set(),
-        "bold_text": [],
-        "tables": [],
-        "links": [],
-        "code_blocks": []
-    }
+    # The converter and the inspector load python-docx and lxml; imported here so that
+    # analyzing Markdown (create_expected_rules_from_md) does not pay for them
+    from generate_word_from_md import generate_docx_bytes, cache_key_for
+    from docx_inspect import inspect_docx
+    from test_docx_format import DocxFormatPrinter
+
+    # Reuse the results of an earlier validation of this exact build
+    docx_source = None
+    if cache is not None:
+        cache_key = cache_key_for(cache, md_file_path)
+        rules_key = rules_cache_key(expected_format_rules)
+        cached = cache.load_validation(cache_key, rules_key)
+        if cached is not None and cache.lookup(cache_key) is not None:
+            if output_docx_path:
+                cache.restore(cache_key, output_docx_path)
+            print(f"✓ Unchanged since last validation, reusing cached results for {md_file_path}")
+            print(f"\nOverall validation: {'Passed' if cached['passed'] else 'Failed'}")
+            return cached['passed'], cached['format_info']
+        docx_source = cache.lookup(cache_key)
+
+    print(f"Step 1: Converting {md_file_path} to DOCX" + (f" ({output_docx_path})" if output_docx_path else " (in memory)"))
     
-    # Analyze document structure
-    for i, paragraph in enumerate(doc.paragraphs):
-        style = paragraph.style.name
-        text = paragraph.text.strip()
-        
-        # Skip empty paragraphs
-        if not text:
-            continue
-            
-        # Store style information
-        format_info["styles"].add(style)
-        
-        # Check for headings
-        if style.startswith('Heading'):
-            level = int(style.split()[-1]) if style.split()[-1].isdigit() else 0
-            format_info["headings"].append((text, level))
-            
-        # Check for lists
-        if style in ['List Bullet', 'List Number', 'List Bullet 2']:
-            format_info["lists"].append(style)
-            
-        # Check for bold text
-        if paragraph.runs:
-            for run in paragraph.runs:
-                if run.bold and run.text.strip():
-                    format_info["bold_text"].append(run.text.strip())
-                    
-        # Check for code blocks
-        if style == 'CodeBlock':
-            format_info["code_blocks"].append(text)
+    # Generate the Word document from Markdown, unless an identical build is cached
+    if docx_source is not None:
+        print("✓ Reusing cached Word document")
+    else:
+        try:
+            docx_source = generate_docx_bytes(md_file_path)
+            print("✓ Successfully generated Word document")
+        except Exception as e:
+            print(f"✗ Failed to generate Word document: {str(e)}")
+            return False, {"error": str(e)}
+        if cache is not None:
+            cache.store_bytes(cache_key, docx_source.getvalue(), source=md_file_path)
+
+    # Writing the document to disk is opt-in
+    if output_docx_path:
+        if isinstance(docx_source, str):
+            shutil.copyfile(docx_source, output_docx_path)
+        else:
+            with open(output_docx_path, 'wb') as docx_file:
+                docx_file.write(docx_source.getvalue())
+        print(f"✓ Wrote Word document: {output_docx_path}")
     
-    # Collect table information
-    for i, table in enumerate(doc.tables):
-        table_data = []
-        for row in table.rows:
-            row_data = [cell.text for cell in row.cells]
-            table_data.append(row_data)
-        format_info["tables"].append(table_data)
+    print("\nStep 2: Testing DOCX formatting")
     
-    # Convert set to list for JSON serialization
-    format_info["styles"] = list(format_info["styles"])
+    # Collect formatting information and print the per-paragraph details in a single pass
+    print("\nDetailed formatting analysis:")
+    printer = DocxFormatPrinter()
+    format_info = inspect_docx(docx_source, visitor=printer)
+    printer.finish()
     
     # Display formatting information
     print("\nDocument formatting summary:")
@@ -107,10 +103,7 @@ def validate_md_to_docx(md_file_path, expected_format_rules=None):
             print(f"  * ... and {len(format_info['headings']) - 3} more")
             
     print(f"- Lists: {len(format_info['lists'])}")
-    list_types = {}
-    for list_type in format_info['lists']:
-        list_types[list_type] = list_types.get(list_type, 0) + 1
-    for list_type, count in list_types.items():
+    for list_type, count in format_info['list_kinds'].items():
         print(f"  * {list_type}: {count}")
         
     print(f"- Tables: {len(format_info['tables'])}")
@@ -128,75 +121,236 @@ def validate_md_to_docx(md_file_path, expected_format_rules=None):
     
     if expected_format_rules:
         print("\nStep 3: Validating against expected format rules")
-        
-        # Validate headings
-        if 'headings' in expected_format_rules:
-            expected_headings = expected_format_rules['headings']
-            actual_headings = format_info['headings']
-            headings_match = True
-            
-            # Check if we have at least the expected headings
-            if len(actual_headings) < len(expected_headings):
-                headings_match = False
-                validation_results["details"]["headings"] = f"Missing headings: expected {len(expected_headings)}, found {len(actual_headings)}"
-            else:
-                # Check each expected heading
-                for i, (expected_text, expected_level) in enumerate(expected_headings):
-                    if i < len(actual_headings):
-                        actual_text, actual_level = actual_headings[i]
-                        if expected_level != actual_level or not re.search(expected_text, actual_text, re.IGNORECASE):
-                            headings_match = False
-                            validation_results["details"]["headings"] = f"Heading mismatch at position {i+1}"
-                            break
-            
-            validation_results["passed"] &= headings_match
-            print(f"✓ Headings validation: {'Passed' if headings_match else 'Failed'}")
-            
-        # Validate lists
-        if 'lists' in expected_format_rules:
-            expected_lists = expected_format_rules['lists']
-            actual_lists = format_info['lists']
-            
-            # Check if all expected list types are present
-            lists_match = all(list_type in actual_lists for list_type in expected_lists)
-            
-            validation_results["passed"] &= lists_match
-            validation_results["details"]["lists"] = "All expected list types found" if lists_match else "Missing some expected list types"
-            print(f"✓ Lists validation: {'Passed' if lists_match else 'Failed'}")
-            
-        # Validate styles
-        if 'styles' in expected_format_rules:
-            expected_styles = expected_format_rules['styles']
-            actual_styles = format_info['styles']
-            
-            # Check if all expected styles are present
-            styles_match = all(style in actual_styles for style in expected_styles)
-            
-            validation_results["passed"] &= styles_match
-            validation_results["details"]["styles"] = "All expected styles found" if styles_match else "Missing some expected styles"
-            print(f"✓ Styles validation: {'Passed' if styles_match else 'Failed'}")
-            
-        # Validate bold text
-        if 'bold_text' in expected_format_rules:
-            expected_bold = expected_format_rules['bold_text']
-            actual_bold = format_info['bold_text']
-            
-            # Check if all expected bold text elements are present
-            bold_match = all(any(re.search(expected, actual, re.IGNORECASE) for actual in actual_bold) 
-                            for expected in expected_bold)
-            
-            validation_results["passed"] &= bold_match
-            validation_results["details"]["bold_text"] = "All expected bold text found" if bold_match else "Missing some expected bold text"
-            print(f"✓ Bold text validation: {'Passed' if bold_match else 'Failed'}")
-            
+        validation_results = check_format_rules(format_info, expected_format_rules)
+        for check, passed in validation_results["checks"].items():
+            print(f"✓ {CHECK_LABELS[check]} validation: {'Passed' if passed else 'Failed'}")
+            if not passed and check in validation_results["details"]:
+                print(f"  {validation_results['details'][check]}")
         print(f"\nOverall validation: {'Passed' if validation_results['passed'] else 'Failed'}")
     
-    # Run the test_docx_format function to get detailed formatting information
-    print("\nDetailed formatting analysis:")
-    test_docx_format(output_docx_path)
+    if cache is not None:
+        cache.store_validation(cache_key, rules_key, {"passed": validation_results["passed"], "format_info": format_info})
     
     return validation_results["passed"], format_info
 
+# Rule checks in the order they run, with their report labels
+CHECK_LABELS = {
+    'headings': 'Headings',
+    'lists': 'Lists',
+    'styles': 'Styles',
+    'bold_text': 'Bold text',
+}
+
+# Longest list of offending items quoted in a check's details
+MAX_REPORTED = 10
+
+class PhraseMatcher(object):
+    """
+    Aho-Corasick automaton over a set of phrases. found_in() reports which
+    of the phrases occur in a sequence of texts in a single pass over the
+    texts, however many phrases there are. Matching is case-insensitive
+    and literal.
+
+    Args:
+        phrases (iterable): Phrases to look for
+    """
+
+    def __init__(self, phrases):
+        self.phrases = sorted({phrase.casefold() for phrase in phrases if phrase})
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, phrase in enumerate(self.phrases):
+            node = 0
+            for char in phrase:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = child
+            self._out[node] += (index,)
+
+        # Failure links, breadth first; each node also reports the phrases of its failure chain
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def found_in(self, texts):
+        """
+        Args:
+            texts (iterable): Texts to search; a phrase must occur within one text
+
+        Returns:
+            set: The (casefolded) phrases that occur in any of the texts
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        for text in texts:
+            node = 0
+            for char in text.casefold():
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+                if out[node]:
+                    found.update(out[node])
+            if len(found) == len(self.phrases):
+                break
+        return {self.phrases[index] for index in found}
+
+def _quoted(items):
+    items = list(items)
+    shown = ', '.join(repr(item) for item in items[:MAX_REPORTED])
+    return shown + (f" and {len(items) - MAX_REPORTED} more" if len(items) > MAX_REPORTED else '')
+
+def check_headings(expected_headings, actual_headings):
+    """
+    Compare headings position by position: each expected heading text must
+    occur (case-insensitively) in the actual heading at the same position,
+    at the same level.
+
+    Returns:
+        tuple: (passed, message or None) - the message lists every mismatch
+    """
+    problems = []
+    if len(actual_headings) < len(expected_headings):
+        problems.append(f"Missing headings: expected {len(expected_headings)}, found {len(actual_headings)}")
+    mismatches = [i + 1 for i, ((expected_text, expected_level), (actual_text, actual_level))
+                  in enumerate(zip(expected_headings, actual_headings))
+                  if expected_level != actual_level or expected_text.casefold() not in actual_text.casefold()]
+    if mismatches:
+        positions = ', '.join(str(position) for position in mismatches[:MAX_REPORTED])
+        more = f" and {len(mismatches) - MAX_REPORTED} more" if len(mismatches) > MAX_REPORTED else ''
+        problems.append(f"Heading mismatch at position{'s' if len(mismatches) > 1 else ''} {positions}{more}")
+    return not problems, '; '.join(problems) or None
+
+def check_bold_text(expected_bold, actual_bold):
+    """
+    Check that every expected bold phrase occurs (case-insensitively) in
+    some bold run. Phrases that are a whole run are found by set lookup;
+    the rest are searched for in all runs at once with a PhraseMatcher.
+
+    Returns:
+        tuple: (passed, missing phrases with their number of occurrences in the source)
+    """
+    expected = collections.Counter(phrase.casefold() for phrase in expected_bold if phrase.strip())
+    actual = [text.casefold() for text in actual_bold]
+    remaining = set(expected) - set(actual)
+    if remaining:
+        remaining -= PhraseMatcher(remaining).found_in(actual)
+    missing = {phrase: expected[phrase] for phrase in expected if phrase in remaining}
+    return not missing, missing
+
+def check_format_rules(format_info, expected_format_rules):
+    """
+    Check a document's formatting summary (see docx_inspect) against expected rules.
+
+    Every check runs in time linear in the size of the rules and the
+    document: expected items are looked up in sets built once, and bold
+    phrases are matched against all bold runs in a single pass.
+
+    Args:
+        format_info (dict): Formatting summary from inspect_docx
+        expected_format_rules (dict): Expected rules, see validate_md_to_docx
+
+    Returns:
+        dict: {"passed": bool, "checks": {check: bool} for each rule present,
+            "details": {check: message}}
+    """
+    validation_results = {"passed": True, "checks": {}, "details": {}}
+    checks = validation_results["checks"]
+    details = validation_results["details"]
+
+    # Validate headings, reporting every mismatch rather than only the first
+    if 'headings' in expected_format_rules:
+        checks["headings"], message = check_headings(expected_format_rules['headings'], format_info['headings'])
+        if message:
+            details["headings"] = message
+
+    # Validate lists and styles: every expected list type and style must be used
+    for check, actual_key, found_message, missing_message in (
+            ('lists', 'lists', "All expected list types found", "Missing list types"),
+            ('styles', 'styles', "All expected styles found", "Missing styles")):
+        if check in expected_format_rules:
+            actual = set(format_info[actual_key])
+            missing = [item for item in dict.fromkeys(expected_format_rules[check]) if item not in actual]
+            checks[check] = not missing
+            details[check] = f"{missing_message}: {_quoted(missing)}" if missing else found_message
+
+    # Validate bold text
+    if 'bold_text' in expected_format_rules:
+        checks["bold_text"], missing = check_bold_text(expected_format_rules['bold_text'], format_info['bold_text'])
+        if missing:
+            occurrences = sum(missing.values())
+            details["bold_text"] = (f"Missing bold text ({len(missing)} phrases, {occurrences} occurrences): "
+                                    f"{_quoted(missing)}")
+        else:
+            details["bold_text"] = "All expected bold text found"
+
+    validation_results["passed"] = all(checks.values())
+    return validation_results
+
+# Patterns of the Markdown scan behind the expected rules. They are kept apart from
+# the converter's tokenizers on purpose, so that a tokenizer bug shows up as a failed check
+HEADING_LINE_PATTERN = re.compile(r'^\*\*.*?\*\*$')
+TABLE_SEPARATOR_LINE_PATTERN = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+# Code spans and links keep their contents literal, so bold markers inside them do not count
+LITERAL_SPAN_PATTERN = re.compile(r'`[^`]+`|\[[^\]]*\]\([^)]*\)')
+BOLD_SPAN_PATTERN = re.compile(r'\*\*\*(.+?)\*\*\*|\*\*(.+?)\*\*')
+
+def scan_markdown(content):
+    """
+    Read headings and bold phrases from Markdown source in one pass,
+    skipping fenced code blocks. Bold phrases are taken from paragraphs and
+    list items; heading lines and table rows are left out.
+
+    Args:
+        content (str): The Markdown source
+
+    Returns:
+        tuple: (heading texts, bold phrases, lines outside code blocks)
+    """
+    headings = []
+    bold_phrases = []
+    text_lines = []
+    lines = content.splitlines()
+    in_code = False
+    in_table = False
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if in_code:
+            in_code = stripped != '```'
+            continue
+        if stripped.startswith('```'):
+            in_code = True
+            continue
+        text_lines.append(line)
+
+        if in_table and '|' in stripped:
+            continue
+        in_table = ('|' in stripped and index + 1 < len(lines)
+                    and TABLE_SEPARATOR_LINE_PATTERN.match(lines[index + 1].strip()) is not None)
+        if in_table:
+            continue
+
+        if HEADING_LINE_PATTERN.match(line):
+            headings.append(line.strip('*'))
+            continue
+        for match in BOLD_SPAN_PATTERN.finditer(LITERAL_SPAN_PATTERN.sub(' ', line)):
+            phrase = match.group(1) or match.group(2)
+            if phrase.strip():
+                bold_phrases.append(phrase)
+    return headings, bold_phrases, text_lines
+
 def create_expected_rules_from_md(md_file_path):
     """
     Analyzes a markdown file and creates expected formatting rules
@@ -208,8 +362,18 @@ def create_expected_rules_from_md(md_file_path):
         dict: Expected format rules
     """
     with open(md_file_path, 'r', encoding='utf-8') as md_file:
-        content = md_file.read()
-    
+        return expected_rules_from_markdown(md_file.read())
+
+def expected_rules_from_markdown(content):
+    """
+    Create expected formatting rules from Markdown source text.
+
+    Args:
+        content (str): The Markdown source
+
+    Returns:
+        dict: Expected format rules
+    """
     expected_rules = {
         'headings': [],
         'lists': [],
@@ -217,44 +381,76 @@ def create_expected_rules_from_md(md_file_path):
         'bold_text': []
     }
     
-    # Find headings (bold lines that are not within lists)
-    heading_pattern = r'^(\*\*.*?\*\*)$'
-    headings = re.findall(heading_pattern, content, re.MULTILINE)
-    
+    headings, bold_phrases, text_lines = scan_markdown(content)
+    text = '\n'.join(text_lines)
+
     # First heading is level 1, rest are level 2
     for i, heading in enumerate(headings):
-        text = heading.strip('*')
         level = 1 if i == 0 else 2
-        expected_rules['headings'].append((text, level))
+        expected_rules['headings'].append((heading, level))
     
-    # Check for list types
-    if re.search(r'^\* ', content, re.MULTILINE):
+    # Check for list types, outside code blocks
+    if re.search(r'^\* ', text, re.MULTILINE):
         expected_rules['lists'].append('List Bullet')
     
-    if re.search(r'^\d+\. ', content, re.MULTILINE):
+    if re.search(r'^\d+\. ', text, re.MULTILINE):
         expected_rules['lists'].append('List Number')
         
-    if re.search(r'^    \* ', content, re.MULTILINE):
+    if re.search(r'^    \* ', text, re.MULTILINE):
         expected_rules['lists'].append('List Bullet 2')
     
     # Check for code blocks
     if '```' in content:
         expected_rules['styles'].append('CodeBlock')
     
-    # Find bold text
-    bold_pattern = r'\*\*(.*?)\*\*'
-    bold_matches = re.findall(bold_pattern, content)
-    expected_rules['bold_text'] = [match for match in bold_matches if match.strip()]
+    # Heading lines are checked as headings, code is never formatted, and
+    # bold runs in table cells are not part of the inspection
+    expected_rules['bold_text'] = bold_phrases
     
     return expected_rules
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python validate_md_to_docx.py <input_md_file> [--analyze-only]")
-        sys.exit(1)
-        
-    md_file_path = sys.argv[1]
-    analyze_only = "--analyze-only" in sys.argv
+def analyze_main(argv=None, prog=None):
+    """
+    Command-line interface of `paperforge analyze`: print the formatting
+    rules expected from one or more Markdown files, without converting them.
+
+    Returns:
+        int: Exit status, 1 if any file could not be read
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=prog, description="Show the formatting rules expected from Markdown files.")
+    parser.add_argument('md_files', nargs='+', metavar='input_md_file', help="Markdown files to analyze")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for md_file_path in args.md_files:
+        try:
+            expected_rules = create_expected_rules_from_md(md_file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"✗ {md_file_path}: {e}")
+            status = 1
+            continue
+        print(f"Markdown analysis results (expected rules) for {md_file_path}:")
+        for category, rules in expected_rules.items():
+            print(f"{category}: {rules}")
+    return status
+
+def main(argv=None, prog=None):
+    """Command-line interface of validate_md_to_docx.py (argv defaults to sys.argv[1:])."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=prog, description="Validate the conversion of a Markdown file to a Word document.")
+    parser.add_argument('input_md_file', help="Markdown file to validate")
+    parser.add_argument('--analyze-only', action='store_true',
+                        help="Only analyze the Markdown and show the expected formatting rules")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Reuse cached documents and validation results for unchanged sources")
+    parser.add_argument('--write-docx', nargs='?', const='', default=None, metavar='PATH',
+                        help="Also write the generated document (default path: <name>_validated.docx next to the source)")
+    args = parser.parse_args(argv)
+
+    md_file_path = args.input_md_file
     
     if not os.path.exists(md_file_path):
         print(f"Error: File {md_file_path} does not exist.")
@@ -263,15 +459,25 @@ if __name__ == "__main__":
     # Create expected rules from Markdown
     expected_rules = create_expected_rules_from_md(md_file_path)
     
-    if analyze_only:
+    if args.analyze_only:
         print("Markdown analysis results (expected rules):")
         for category, rules in expected_rules.items():
             print(f"{category}: {rules}")
     else:
         # Validate the conversion
-        passed, results = validate_md_to_docx(md_file_path, expected_rules)
+        from generate_word_from_md import open_build_cache
+        cache = open_build_cache(args.cache_dir) if args.cache_dir else None
+        output_docx_path = None
+        if args.write_docx is not None:
+            output_docx_path = args.write_docx or default_output_path(md_file_path)
+        passed, results = validate_md_to_docx(md_file_path, expected_rules, cache=cache, output_docx_path=output_docx_path)
+        if cache is not None:
+            cache.evict()
         
         # Print final result
         print("\n" + "="*50)
         print(f"VALIDATION {'PASSED' if passed else 'FAILED'}")
-        print("="*50)
\ No newline at end of file
+        print("="*50)
+
+if __name__ == "__main__":
+    main()
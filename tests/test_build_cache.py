@@ -0,0 +1,10 @@
+from generate_word_from_md import cache_key_for, open_build_cache, open_image_pipeline
+
+
+def test_default_pipeline_shares_the_cache_key(tmp_path):
+    source = tmp_path / 'doc.md'
+    source.write_text("**Heading**\n\nText\n", encoding='utf-8')
+    cache = open_build_cache(str(tmp_path / 'cache'))
+    # The generate CLI passes a pipeline, the validators pass none
+    assert cache_key_for(cache, str(source), images=open_image_pipeline()) == cache_key_for(cache, str(source))
+    assert cache_key_for(cache, str(source), images=open_image_pipeline(dpi=96)) != cache_key_for(cache, str(source))
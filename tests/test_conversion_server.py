@@ -0,0 +1,65 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+from corpus import write_png
+from conversion_server import ConversionServer, NoImages, convert_markdown
+from parallel_docx import convert_stream_parallel
+
+
+@pytest.fixture
+def image_markdown(tmp_path):
+    path = tmp_path / 'small.png'
+    write_png(path, 4, 4, (255, 0, 0))
+    return f"**Heading**\n\n![x]({path})\n"
+
+
+def media_parts(docx_bytes):
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as package:
+        return [name for name in package.namelist() if name.startswith('word/media/')]
+
+
+async def post(server, target, body):
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    async with listener:
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        data = body.encode('utf-8')
+        writer.write(f"POST {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode('latin-1')
+                     + data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), payload
+
+
+def test_server_refuses_parallel_backend(image_markdown):
+    server = ConversionServer(workers=1)
+
+    async def run():
+        server.start_pool()
+        try:
+            return await post(server, '/convert?backend=parallel', image_markdown)
+        finally:
+            server.shutdown()
+
+    status, payload = asyncio.run(run())
+    assert status == 400
+    assert 'parallel' in json.loads(payload)["error"]
+
+
+def test_server_without_image_root_embeds_no_images(image_markdown):
+    for backend in ('docx', 'fast', 'chunked'):
+        assert media_parts(convert_markdown(image_markdown, backend=backend)) == []
+    with pytest.raises(ValueError):
+        convert_markdown(image_markdown, backend='parallel')
+
+
+def test_parallel_workers_keep_the_image_policy(image_markdown):
+    buffer = io.BytesIO()
+    convert_stream_parallel(io.StringIO(image_markdown), buffer, images=NoImages(), jobs=1)
+    assert media_parts(buffer.getvalue()) == []
@@ -0,0 +1,38 @@
+import io
+import zipfile
+
+from corpus import write_png
+from docx_diff import diff_docx
+from generate_word_from_md import convert_stream
+
+
+def convert(markdown, path):
+    convert_stream(io.StringIO(markdown), str(path), backend='fast')
+    return str(path)
+
+
+def rewrite_part(src, dst, name, replace):
+    with zipfile.ZipFile(src) as package, zipfile.ZipFile(dst, 'w', zipfile.ZIP_DEFLATED) as out:
+        for item in package.infolist():
+            data = package.read(item.filename)
+            out.writestr(item, replace(data) if item.filename == name else data)
+    return str(dst)
+
+
+def test_lost_code_font_is_a_formatting_change(tmp_path):
+    a = convert("Run `make` first\n", tmp_path / 'a.docx')
+    b = rewrite_part(a, tmp_path / 'b.docx', 'word/document.xml',
+                     lambda xml: xml.replace(b'<w:rFonts w:ascii="Courier New" w:hAnsi="Courier New"/>', b''))
+    report = diff_docx(a, b)
+    assert not report["identical"]
+    assert report["differences"][0]["changed"] == [["formatting"]]
+
+
+def test_changed_picture_is_reported(tmp_path):
+    write_png(tmp_path / 'red.png', 4, 4, (255, 0, 0))
+    write_png(tmp_path / 'blue.png', 4, 4, (0, 0, 255))
+    a = convert(f"![x]({tmp_path / 'red.png'})\n", tmp_path / 'a.docx')
+    b = convert(f"![x]({tmp_path / 'blue.png'})\n", tmp_path / 'b.docx')
+    report = diff_docx(a, b)
+    assert not report["identical"]
+    assert report["differences"][0]["changed"] == [["images"]]
@@ -0,0 +1,15 @@
+from docx.enum.style import WD_STYLE_TYPE
+from docx.shared import Pt
+
+from docx_template import DocumentTemplate
+
+
+def test_style_changes_stay_in_their_document():
+    template = DocumentTemplate()
+    first = template.new_document()
+    first.styles.add_style('Leaky', WD_STYLE_TYPE.PARAGRAPH)
+    first.styles['Normal'].font.size = Pt(31)
+
+    second = template.new_document()
+    assert 'Leaky' not in second.styles
+    assert second.styles['Normal'].font.size != Pt(31)
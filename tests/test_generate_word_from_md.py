@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+SCRIPT = os.path.join(ROOT, 'scripts', 'generate_word_from_md.py')
+
+
+@pytest.mark.parametrize('backend', ['docx', 'fast'])
+def test_stdout_carries_only_the_document(backend, tmp_path):
+    result = subprocess.run([sys.executable, SCRIPT, '-', '-', '--backend', backend],
+                            input=b'**Heading**\n\n![x](missing.png)\n', capture_output=True, cwd=tmp_path)
+    assert result.returncode == 0
+    assert result.stdout.startswith(b'PK')
+    assert b'Error adding image missing.png' in result.stderr
@@ -0,0 +1,15 @@
+import pytest
+
+from html_writer import inline_html
+
+
+@pytest.mark.parametrize('url', ['javascript:document.cookie', 'JavaScript:x', 'java\tscript:x',
+                                 ' javascript:x', 'data:text/html,x', 'vbscript:x'])
+def test_unsafe_links_are_rendered_as_text(url):
+    assert inline_html(f'[me]({url})') == 'me'
+
+
+@pytest.mark.parametrize('url', ['https://example.com/?a=1', 'http://example.com', 'mailto:me@example.com',
+                                 'docs/page.html', '#top', '../a:b.html'])
+def test_safe_links_are_kept(url):
+    assert inline_html(f'[me]({url})').startswith('<a href="')
@@ -0,0 +1,17 @@
+import pytest
+
+from md_blocks import iter_blocks, TABLE
+
+
+@pytest.mark.parametrize('separator, align', [
+    ('|:--|:-:|--:|', ['left', 'center', 'right']),
+    ('|:---|:---:|---:|', ['left', 'center', 'right']),
+    ('|-|-|-|', [None, None, None]),
+    ('| - | :- | -: |', [None, 'left', 'right']),
+    (':-|:-:|-:', ['left', 'center', 'right']),
+])
+def test_table_separator_forms(separator, align):
+    blocks = list(iter_blocks(['| a | b | c |\n', separator + '\n', '| 1 | 2 | 3 |\n'], title=False))
+    assert [block.kind for block in blocks] == [TABLE]
+    assert blocks[0].rows == [['a', 'b', 'c'], ['1', '2', '3']]
+    assert blocks[0].align == align
@@ -0,0 +1,27 @@
+from validate_md_to_docx import expected_rules_from_markdown
+
+SOURCE = """**Title**
+
+Some **bold** text and `**not bold**` code.
+
+```
+**not a heading**
+* not a list item
+```
+
+**Section**
+
+* item with ***both***
+
+| **cell** | b |
+|:--|--:|
+| 1 | 2 |
+"""
+
+
+def test_expected_rules_skip_code_and_tables():
+    rules = expected_rules_from_markdown(SOURCE)
+    assert rules['headings'] == [('Title', 1), ('Section', 2)]
+    assert rules['bold_text'] == ['bold', 'both']
+    assert rules['lists'] == ['List Bullet']
+    assert 'CodeBlock' in rules['styles']